@@ -0,0 +1,148 @@
+"""Benchmark for typo-tolerant answer matching (services/answer_matching.py).
+
+Builds --keys fill_ups and short_answer answer keys from a science vocabulary
+and grades --answers student answers against them on one core: a quarter
+correct, a quarter with one or two typos, a quarter wrong, and a quarter
+"near misses" that answer with the opposite or look-alike term
+(hypotonic for hypertonic, photons for protons), which are also wrong.
+Reports answers per second for each question type, how many typo answers
+were accepted, and how many wrong answers and near misses slipped through.
+The exact-only matcher (GRADING_FUZZY=0) is timed too.
+
+Usage: python bench_answer_matching.py [--answers 200000] [--keys 200] [--max-edits 2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.answer_matching import AnswerMatcher
+
+VOCABULARY = (
+    "photosynthesis chlorophyll mitochondria respiration glucose enzyme protein membrane nucleus "
+    "ribosome osmosis diffusion chromosome mutation evolution ecosystem producer consumer "
+    "decomposer velocity acceleration momentum friction gravity inertia energy voltage current "
+    "resistance magnetism molecule catalyst oxidation reduction equilibrium isotope electron "
+    "neutron proton democracy parliament constitution revolution industrial empire treaty "
+    "erosion sediment volcano earthquake climate latitude longitude"
+).split()
+FILLER = "the a of in and is it by which so that because this makes".split()
+# Different terms a typo budget would reach
+NEAR_MISSES = [
+    ("hypertonic", "hypotonic"), ("exothermic", "endothermic"), ("hyperglycemia", "hypoglycemia"),
+    ("anabolism", "catabolism"), ("endocytosis", "exocytosis"), ("hydrophobic", "hydrophilic"),
+    ("protons", "photons"), ("mitosis", "meiosis"), ("intracellular", "intercellular"),
+    ("afferent", "efferent"), ("abduction", "adduction"), ("lipase", "lipose"),
+    ("autotroph", "heterotroph"), ("haploid", "diploid"), ("cation", "anion"),
+]
+KINDS = ("correct", "typo", "wrong", "near miss")
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("swap", "drop", "replace", "insert"))
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "replace":
+        return word[:i] + rng.choice("aeiourstn") + word[i + 1:]
+    return word[:i] + rng.choice("aeiourstn") + word[i:]
+
+
+def make_cases(rng, keys, answers):
+    fill_keys = [rng.choice(VOCABULARY) for _ in range(keys)]
+    short_keys = [rng.sample(VOCABULARY, 4) for _ in range(keys)]
+    # Near-miss keys: one of a pair (either way round); short answers need
+    # one of two keywords, so the look-alike alone would decide the grade
+    pairs = NEAR_MISSES + [(b, a) for a, b in NEAR_MISSES]
+    near_base = len(fill_keys)
+    fill_keys += [key for key, _ in pairs]
+    short_keys += [[key, rng.choice(VOCABULARY)] for key, _ in pairs]
+
+    fill_cases, short_cases = [], []
+    for n in range(answers // 2):
+        kind = KINDS[n % len(KINDS)]
+        if kind == "near miss":
+            pair = rng.randrange(len(pairs))
+            key, word = near_base + pair, pairs[pair][1]
+            fill_cases.append((key, word, kind))
+            words = [word] + rng.sample(FILLER, 5)
+            rng.shuffle(words)
+            short_cases.append((key, " ".join(words), kind))
+            continue
+        key = rng.randrange(keys)
+
+        word = fill_keys[key]
+        if kind == "typo":
+            word = typo(word, rng)
+        elif kind == "wrong":
+            word = rng.choice([w for w in VOCABULARY if w != fill_keys[key]])
+        fill_cases.append((key, word.capitalize() if n % 2 else word, kind))
+
+        keywords = short_keys[key]
+        if kind == "wrong":
+            used = rng.sample([w for w in VOCABULARY if w not in keywords], 3)
+        else:
+            used = rng.sample(keywords, 3)
+            if kind == "typo":
+                used = [typo(w, rng) for w in used]
+        words = used + rng.sample(FILLER, 5)
+        rng.shuffle(words)
+        short_cases.append((key, " ".join(words), kind))
+    return fill_keys, short_keys, fill_cases, short_cases
+
+
+def run(compiled, cases):
+    accepted = dict.fromkeys(KINDS, 0)
+    start = time.perf_counter()
+    for key, answer, kind in cases:
+        if compiled[key].match(answer):
+            accepted[kind] += 1
+    return time.perf_counter() - start, accepted
+
+
+def report(label, elapsed, accepted, cases):
+    totals = {kind: sum(1 for case in cases if case[2] == kind) for kind in accepted}
+    print(f"{label:<22} {len(cases) / elapsed:>10,.0f} answers/s | "
+          f"correct accepted {accepted['correct'] / totals['correct']:.1%}, "
+          f"typos accepted {accepted['typo'] / totals['typo']:.1%}, "
+          f"wrong accepted {accepted['wrong'] / totals['wrong']:.1%}, "
+          f"near misses accepted {accepted['near miss'] / totals['near miss']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--max-edits", type=int, default=2)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    fill_keys, short_keys, fill_cases, short_cases = make_cases(rng, args.keys, args.answers)
+
+    for label, matcher in (("fuzzy", AnswerMatcher(fuzzy=True, max_edits=args.max_edits)),
+                           ("exact", AnswerMatcher(fuzzy=False))):
+        start = time.perf_counter()
+        fill = [matcher.compile_exact(key) for key in fill_keys]
+        short = [matcher.compile_keywords(keywords) for keywords in short_keys]
+        compile_ms = (time.perf_counter() - start) * 1000 / (len(fill) + len(short))
+        print(f"--- {label} (compile {compile_ms:.3f} ms per answer key) ---")
+
+        # One pass over freshly compiled keys: lookups are memoized per key,
+        # and only repeats within the pass (as in a real class) benefit
+        fill_time, fill_accepted = run(fill, fill_cases)
+        short_time, short_accepted = run(short, short_cases)
+        report("fill_ups", fill_time, fill_accepted, fill_cases)
+        report("short_answer", short_time, short_accepted, short_cases)
+        print(f"{'mixed':<22} {(len(fill_cases) + len(short_cases)) / (fill_time + short_time):>10,.0f} answers/s")
+
+
+if __name__ == "__main__":
+    main()
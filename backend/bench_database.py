@@ -0,0 +1,77 @@
+"""Micro-benchmark for per-call Database latency.
+
+Compares the old connect-per-call behaviour (default rollback journal, no
+pragmas) against the pooled WAL connections for create_session, get_quiz and
+save_submission.
+
+Usage: python bench_database.py [--iterations 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Add current directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.database import Database
+
+
+class UnpooledDatabase(Database):
+    """Reproduces the original behaviour: a fresh default connection per call"""
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def time_calls(label, func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / iterations * 1e6
+    print(f"  {label:<16} {per_call_us:9.1f} us/call")
+    return per_call_us
+
+
+def run(db: Database, iterations: int):
+    session_id = db.create_session("bench", "text " * 200, ["Topic A", "Topic B"])
+    quiz = {"questions": [{"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct_answer": 0} for i in range(18)]}
+    quiz_id = db.save_quiz(session_id, quiz, "initial")
+    results = [{"question_index": i, "user_answer": 0, "correct_answer": 0, "is_correct": True} for i in range(18)]
+
+    return {
+        "create_session": time_calls("create_session", lambda i: db.create_session("bench", "text", ["Topic"]), iterations),
+        "get_quiz": time_calls("get_quiz", lambda i: db.get_quiz(quiz_id), iterations),
+        "save_submission": time_calls("save_submission", lambda i: db.save_submission(quiz_id, session_id, 75.0, results), iterations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Before (connect per call, rollback journal):")
+        before = run(UnpooledDatabase(os.path.join(tmp, "before.db")), args.iterations)
+
+        print("After (pooled WAL connections):")
+        after = run(Database(os.path.join(tmp, "after.db")), args.iterations)
+
+    print("Speedup:")
+    for name in before:
+        print(f"  {name:<16} {before[name] / after[name]:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
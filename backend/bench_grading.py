@@ -0,0 +1,132 @@
+"""Benchmark for grading an exam-day burst of submissions.
+
+A class of --students submits answers to the same --quizzes quizzes
+(--questions mixed mcq/fill_ups/short_answer questions each). Compares:
+  - per-request: the original submit_quiz loop, get_quiz + JSON decode and
+    keyword splitting for every submission, one save per submission
+  - compiled: GradingService.submit, one cached answer key per quiz
+  - batch: GradingService.submit_many, as used by /api/submit-quizzes
+and checks that all three grade identically (typo tolerance off, see
+bench_answer_matching.py for that).
+
+Usage: python bench_grading.py [--students 300] [--quizzes 3] [--questions 18]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.database import Database
+from services.answer_matching import AnswerMatcher
+from services.grading import GradingService
+
+
+def grade_original(db, quiz_id, session_id, answers):
+    """The pre-compiled-key submit_quiz body"""
+    quiz = db.get_quiz(quiz_id)
+    correct = 0
+    total = len(quiz["questions"])
+    results = []
+    for i, question in enumerate(quiz["questions"]):
+        user_answer = answers.get(str(i))
+        correct_answer = question["correct_answer"]
+        q_type = question.get("question_type", "mcq")
+        is_correct = False
+        if q_type == "mcq":
+            is_correct = (str(user_answer) == str(correct_answer))
+        elif q_type == "fill_ups":
+            if isinstance(user_answer, str) and isinstance(correct_answer, str):
+                is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
+        elif q_type == "short_answer":
+            if isinstance(user_answer, str) and isinstance(correct_answer, str):
+                keywords = [k.strip().lower() for k in correct_answer.split(",")]
+                user_val = user_answer.lower()
+                matches = [k for k in keywords if k in user_val]
+                is_correct = len(matches) >= (len(keywords) + 1) // 2
+        if is_correct:
+            correct += 1
+        results.append({"question_index": i, "user_answer": user_answer,
+                        "correct_answer": correct_answer, "is_correct": is_correct})
+    score = (correct / total) * 100
+    db.save_submission(quiz_id, session_id, score, results)
+    return score, results
+
+
+WORDS = "cell energy atp membrane protein enzyme nucleus glucose oxygen carbon".split()
+
+
+def make_quiz(rng, num_questions):
+    questions = []
+    for i in range(num_questions):
+        kind = ("mcq", "fill_ups", "short_answer")[i % 3]
+        if kind == "mcq":
+            questions.append({"question": f"Q{i}", "options": ["a", "b", "c", "d"],
+                              "correct_answer": rng.randrange(4), "question_type": kind})
+        elif kind == "fill_ups":
+            questions.append({"question": f"Q{i}", "correct_answer": rng.choice(WORDS).capitalize(), "question_type": kind})
+        else:
+            questions.append({"question": f"Q{i}", "correct_answer": ", ".join(rng.sample(WORDS, 4)), "question_type": kind})
+    return {"questions": questions}
+
+
+def make_answers(rng, quiz):
+    answers = {}
+    for i, question in enumerate(quiz["questions"]):
+        if question["question_type"] == "mcq":
+            answers[str(i)] = rng.randrange(4)
+        elif question["question_type"] == "fill_ups":
+            answers[str(i)] = rng.choice(WORDS) + rng.choice(["", " "])
+        else:
+            answers[str(i)] = "The " + " and ".join(rng.sample(WORDS, 3))
+    return answers
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--quizzes", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=18)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(db_path=os.path.join(tmp, "bench.db"))
+        session_id = db.create_session("bench", "text", ["Topic"])
+        quizzes = {}
+        for _ in range(args.quizzes):
+            quiz = make_quiz(rng, args.questions)
+            quizzes[db.save_quiz(session_id, quiz, "initial")] = quiz
+        burst = [{"quiz_id": quiz_id, "session_id": session_id, "answers": make_answers(rng, quiz)}
+                 for quiz_id, quiz in quizzes.items() for _ in range(args.students)]
+
+        # Typo tolerance accepts more answers; compare like for like
+        exact = AnswerMatcher(fuzzy=False)
+        grading = GradingService(db, matcher=exact)
+        original, t_original = timed(lambda: [grade_original(db, s["quiz_id"], s["session_id"], s["answers"]) for s in burst])
+        compiled, t_compiled = timed(lambda: [grading.submit(s["quiz_id"], s["session_id"], s["answers"]) for s in burst])
+        grading = GradingService(db, matcher=exact)  # cold key cache for the batch
+        batch, t_batch = timed(lambda: grading.submit_many(burst))
+
+        print(f"{len(burst)} submissions, {args.quizzes} quizzes x {args.questions} questions")
+        for label, elapsed in (("per-request", t_original), ("compiled", t_compiled), ("batch", t_batch)):
+            print(f"{label:<12} {elapsed:.3f}s ({len(burst) / elapsed:,.0f} submissions/s, {t_original / elapsed:.1f}x)")
+        same = all(
+            o == (c["score"], c["results"]) == (b["score"], b["results"])
+            for o, c, b in zip(original, compiled, batch)
+        )
+        print(f"Grades identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Throughput benchmark for the local T5 fallback.
+
+Generates the same quiz with the local model one segment per generate() call
+(batch size 1, the old behaviour) and with padded batches, and reports
+questions/sec for each, plus the process's peak memory. Run it once per
+--backend (torch, torch-int8, onnx) to compare inference backends. Needs
+torch and transformers; the flan-t5-base weights are downloaded on first run.
+
+With --users N it then simulates N students falling back to the local model
+at once (each asking for a small quiz) and compares aggregate questions/sec
+with and without micro-batching across requests.
+
+Usage: python bench_local_quiz.py [--questions 18] [--batch-sizes 1,4,8,16] [--threads 0] [--repeats 2]
+                                  [--backend torch] [--model-path PATH] [--users 0] [--user-questions 3]
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.quiz_generator import QuizGenerator
+
+TOPICS = ["Photosynthesis", "Cellular Respiration", "Mitochondria", "Chloroplast Structure"]
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose molecules inside the chloroplast",
+    "The Calvin Cycle fixes atmospheric carbon dioxide using ATP and NADPH produced by the light reactions",
+    "Cellular Respiration breaks glucose down into pyruvate during glycolysis in the cytoplasm of the cell",
+    "The Krebs Cycle oxidizes acetyl groups in the mitochondrial matrix and releases carbon dioxide as waste",
+    "Oxidative Phosphorylation uses the proton gradient across the inner membrane to drive ATP Synthase",
+    "Chlorophyll absorbs mostly red and blue wavelengths of light and reflects green wavelengths back",
+    "The Thylakoid Membrane contains photosystems that split water and release oxygen as a byproduct",
+    "Fermentation regenerates NAD+ when oxygen is unavailable, producing lactate or ethanol in the process",
+    "The Electron Transport Chain passes electrons between protein complexes embedded in the membrane",
+    "Stomata regulate gas exchange in leaves and close during drought to limit the loss of water vapour",
+]
+
+
+def build_context(num_questions):
+    # Enough distinct >60 character segments for every requested question
+    repeats = num_questions // len(SENTENCES) + 1
+    return ". ".join(f"{s} (part {i})" for i in range(repeats) for s in SENTENCES) + "."
+
+
+def run_concurrent(generator, context, users, questions):
+    threads = [
+        threading.Thread(target=generator._generate_local_quiz, args=(TOPICS, context, questions, "medium", "Mixed"))
+        for _ in range(users)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=18)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads for torch or onnxruntime (0 = library default)")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--backend", default="torch", help="torch, torch-int8 or onnx")
+    parser.add_argument("--model-path", default="", help="defaults to the backend's standard location")
+    parser.add_argument("--users", type=int, default=0, help="concurrent quiz requests for the micro-batching comparison")
+    parser.add_argument("--user-questions", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["LOCAL_NUM_THREADS"] = str(args.threads)
+    os.environ["LOCAL_MODEL_BACKEND"] = args.backend
+    os.environ["LOCAL_MODEL_PATH"] = args.model_path
+    generator = QuizGenerator()
+    if not generator._init_local_model():
+        raise SystemExit("Local model could not be loaded (are torch and transformers installed?)")
+
+    context = build_context(args.questions)
+    # Warm-up pass so weight loading and allocator growth aren't timed
+    generator._generate_local_quiz(TOPICS, context, 2, "medium", "Mixed")
+
+    baseline = None
+    print(f"--- {generator.local.info()['backend']} backend, {args.questions} questions, best of {args.repeats} ---")
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        generator.local.batch_size = batch_size
+        best = None
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            quiz = generator._generate_local_quiz(TOPICS, context, args.questions, "medium", "Mixed")
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rate = len(quiz["questions"]) / best
+        baseline = baseline or rate
+        print(f"batch {batch_size:>3}: {best:6.2f}s  {rate:6.2f} questions/sec  ({rate / baseline:.1f}x)")
+
+    if args.users:
+        batcher = generator.local
+        wait_ms = batcher.max_wait * 1000
+        print(f"--- {args.users} concurrent users x {args.user_questions} questions, batch size {batcher.batch_size} ---")
+        for label, max_wait in (("no wait window", 0.0), (f"{wait_ms:.0f} ms window", batcher.max_wait)):
+            batcher.max_wait = max_wait
+            before = batcher.stats()
+            elapsed = run_concurrent(generator, context, args.users, args.user_questions)
+            after = batcher.stats()
+            batches = after["batches"] - before["batches"]
+            rate = args.users * args.user_questions / elapsed
+            print(f"{label:>15}: {elapsed:6.2f}s  {rate:6.2f} questions/sec  {batches} batches")
+        print(f"Scheduler: {batcher.stats()}")
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(f"Peak memory: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark for EasyOCR with and without image preprocessing.
+
+Renders synthetic fixtures in the style of backend_test_image.png, each with
+known text:
+  - label: a small 400x100 image, like the debug_ocr_local.py test image
+  - photo: a 4000x3000 "phone photo" of a page, grey and slightly noisy
+  - screenshot: a 1080px wide, very tall scrolling screenshot
+and for each reports seconds per image and character accuracy for:
+  - raw: the original image path straight to readtext with mag_ratio=1.5
+  - preprocessed: ImagePreprocessor (scaling, binarization, tiling) first
+Character accuracy is 1 - edit distance / length of the expected text, after
+collapsing whitespace.
+
+With --preprocess-only (or when EasyOCR isn't installed) only the
+preprocessing step is timed and the tile count reported.
+
+Usage: python bench_ocr.py [--runs 1] [--lines 120] [--keep DIR] [--preprocess-only]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from services.image_preprocess import ImagePreprocessor
+from services.ocr_service import OCRService
+
+WORDS = ("photosynthesis mitochondria enzyme osmosis neuron velocity momentum "
+         "integral derivative matrix vector theorem syllabus quiz chapter unit "
+         "revolution empire treaty climate erosion molecule catalyst").split()
+
+
+def random_lines(count, rng):
+    return [" ".join(rng.choice(WORDS).capitalize() if i == 0 else rng.choice(WORDS)
+                     for i in range(rng.randint(4, 7))) for _ in range(count)]
+
+
+def render(size, lines, font_size, background=255, noise=0, origin=(10, 10), rng=None):
+    image = Image.new("L", size, color=background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=font_size)
+    x, y = origin
+    for line in lines:
+        draw.text((x, y), line, fill=0, font=font)
+        y += int(font_size * 1.6)
+    if noise:
+        pixels = image.load()
+        for _ in range(size[0] * size[1] // 50):
+            px, py = rng.randrange(size[0]), rng.randrange(size[1])
+            pixels[px, py] = max(0, min(255, pixels[px, py] + rng.randint(-noise, noise)))
+    return image.convert("RGB")
+
+
+def make_fixtures(out_dir, lines, rng):
+    fixtures = []
+
+    label = ["HELLO WORLD TEST"]
+    path = os.path.join(out_dir, "label.png")
+    render((400, 100), label, 24).save(path)
+    fixtures.append(("label", path, "\n".join(label)))
+
+    photo = random_lines(25, rng)
+    path = os.path.join(out_dir, "photo.jpg")
+    render((4000, 3000), photo, 80, background=200, noise=40, origin=(200, 200), rng=rng).save(path, quality=90)
+    fixtures.append(("photo", path, "\n".join(photo)))
+
+    screenshot = random_lines(lines, rng)
+    height = 40 + int(28 * 1.6) * lines
+    path = os.path.join(out_dir, "screenshot.png")
+    render((1080, height), screenshot, 28, origin=(20, 20)).save(path)
+    fixtures.append(("screenshot", path, "\n".join(screenshot)))
+    return fixtures
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(predicted, expected):
+    predicted = re.sub(r"\s+", " ", predicted).strip()
+    expected = re.sub(r"\s+", " ", expected).strip()
+    return max(0.0, 1 - edit_distance(predicted, expected) / max(1, len(expected)))
+
+
+def timed(func, runs):
+    result = None
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = func()
+    return result, (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--lines", type=int, default=120, help="Lines of text in the tall screenshot")
+    parser.add_argument("--keep", help="Write the fixtures here instead of a temp directory")
+    parser.add_argument("--preprocess-only", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    tmp = None
+    out_dir = args.keep
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        out_dir = tmp.name
+    fixtures = make_fixtures(out_dir, args.lines, rng)
+
+    ocr = None
+    if not args.preprocess_only:
+        ocr = OCRService()
+        ocr._initialize_reader()
+        if ocr.reader is None:
+            print("EasyOCR is not available; timing preprocessing only")
+            ocr = None
+
+    preprocessor = ImagePreprocessor()
+    for name, path, expected in fixtures:
+        with Image.open(path) as image:
+            size = image.size
+        print(f"--- {name} ({size[0]}x{size[1]}, {len(expected)} characters) ---")
+
+        with tempfile.TemporaryDirectory() as tiles_dir:
+            tiles, t_prep = timed(lambda: preprocessor.prepare_file(path, tiles_dir), args.runs)
+            with Image.open(tiles[0]) as first:
+                print(f"preprocess: {t_prep:.3f}s/image, {len(tiles)} tile(s) of width {first.width}")
+
+        if ocr is None:
+            continue
+        ocr.preprocess = False
+        raw, t_raw = timed(lambda: ocr.extract_text_from_image(path), args.runs)
+        ocr.preprocess = True
+        prepared, t_prepared = timed(lambda: ocr.extract_text_from_image(path), args.runs)
+        print(f"raw:          {t_raw:.2f}s/image, accuracy {char_accuracy(raw, expected):.1%}")
+        print(f"preprocessed: {t_prepared:.2f}s/image, accuracy {char_accuracy(prepared, expected):.1%} "
+              f"({t_raw / t_prepared:.1f}x)")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Startup-time benchmark for the API process.
+
+Imports ``main`` in a fresh interpreter several times and reports the import
+time and which heavy libraries were pulled in eagerly. With uvicorn installed
+it also boots the server and measures time to the first 200 from /healthz and
+from /readyz (warm-up finished).
+
+Usage: python bench_startup.py [--runs 5] [--port 8765] [--no-server]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ["torch", "transformers", "easyocr", "google.generativeai", "PyPDF2", "PIL"]
+
+IMPORT_SNIPPET = f"""
+import sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(f"RESULT {{elapsed:.4f}} {{','.join(loaded)}}")
+"""
+
+
+def time_import(runs):
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT")), None)
+        if line is None:
+            print(out.stdout[-2000:])
+            print(out.stderr[-2000:])
+            raise SystemExit("import main failed")
+        parts = line.split(" ")
+        timings.append(float(parts[1]))
+        loaded = parts[2] if len(parts) > 2 else ""
+    return timings, loaded
+
+
+def wait_for(url, timeout):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def time_server(port, timeout=120):
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("uvicorn not installed, skipping server boot timing")
+        return
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        healthy = wait_for(f"http://127.0.0.1:{port}/healthz", timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/readyz", timeout)
+        total = time.perf_counter() - start
+        print(f"Time to /healthz: {healthy:.2f}s" if healthy is not None else "/healthz never answered")
+        print(f"Time to /readyz:  {total:.2f}s" if ready is not None else "/readyz never became ready")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-server", action="store_true")
+    args = parser.parse_args()
+
+    timings, loaded = time_import(args.runs)
+    print(f"--- import main ({args.runs} runs) ---")
+    print(f"median {statistics.median(timings):.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s")
+    print(f"Heavy modules loaded at import: {loaded or 'none'}")
+
+    if not args.no_server:
+        print("--- server boot ---")
+        time_server(args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark stats queries on a large submissions table.
+
+Seeds a temporary database with --rows submissions spread over --sessions
+sessions, then times the original get_last_score and get_performance_stats
+queries (recomputed from submissions) with the submissions indexes dropped
+and in place, and the current methods reading the session_stats aggregates.
+Then pages through each sampled session's history with get_quiz_history.
+
+Usage: python bench_stats_indexes.py [--rows 1000000] [--sessions 2000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+# Add current directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.database import Database
+from database.migrations import MIGRATIONS, backfill_session_stats
+
+
+def seed(db: Database, rows: int, sessions: int):
+    session_ids = [db.create_session("bench", "text", ["Topic A", "Topic B"]) for _ in range(sessions)]
+    base = time.time() - 365 * 86400
+    batch = []
+    with db.connection() as conn:
+        for i in range(rows):
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + i * 30))
+            batch.append((str(uuid.uuid4()), "quiz", random.choice(session_ids), random.uniform(0, 100), "[]", created))
+            if len(batch) >= 50000:
+                conn.executemany("INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?)", batch)
+        # Rows were inserted directly, so build the aggregates as migration 5 would
+        backfill_session_stats(conn)
+    return session_ids
+
+
+def scan_last_score(db: Database, session_id: str) -> float:
+    """The pre-aggregate get_last_score"""
+    with db.connection() as conn:
+        row = conn.execute("""
+            SELECT score FROM submissions WHERE session_id = ?
+            ORDER BY created_at DESC LIMIT 1
+        """, (session_id,)).fetchone()
+    return row[0] if row else 50.0
+
+
+def scan_performance_stats(db: Database, session_id: str):
+    """The pre-aggregate get_performance_stats"""
+    with db.connection() as conn:
+        submissions = conn.execute("""
+            SELECT score, created_at FROM submissions WHERE session_id = ?
+            ORDER BY created_at
+        """, (session_id,)).fetchall()
+        if not submissions:
+            return None
+        session = db._fetch_session(conn, session_id)
+    average_score = sum(s[0] for s in submissions) / len(submissions)
+    return {
+        "total_quizzes": len(submissions),
+        "average_score": average_score,
+        "topic_performance": {topic: average_score for topic in session["topics"]},
+        "quiz_history": [{"score": score, "date": date, "quiz_number": i + 1}
+                         for i, (score, date) in enumerate(submissions)]
+    }
+
+
+def time_queries(session_ids, queries: int, last_score, performance_stats):
+    sample = random.sample(session_ids, min(queries, len(session_ids)))
+    timings = {}
+    for name, func in (("get_last_score", last_score), ("get_performance_stats", performance_stats)):
+        start = time.perf_counter()
+        for session_id in sample:
+            func(session_id)
+        timings[name] = (time.perf_counter() - start) / len(sample) * 1000
+        print(f"  {name:<22} {timings[name]:9.3f} ms/call")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    # The session/time index (migration 7) replaced the migration 2 one
+    index_statements = [
+        step for version, _, steps in MIGRATIONS if version == 7
+        for step in steps if isinstance(step, str) and step.startswith("CREATE INDEX")
+    ]
+    index_names = [stmt.split("EXISTS ")[1].split(" ")[0] for stmt in index_statements]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        print(f"Seeding {args.rows} submissions across {args.sessions} sessions...")
+        start = time.perf_counter()
+        session_ids = seed(db, args.rows, args.sessions)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        with db.connection() as conn:
+            for name in index_names:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        print("Recomputed, without indexes (full table scans):")
+        before = time_queries(session_ids, args.queries,
+                              lambda s: scan_last_score(db, s), lambda s: scan_performance_stats(db, s))
+
+        with db.connection() as conn:
+            for stmt in index_statements:
+                conn.execute(stmt)
+            conn.execute("ANALYZE")
+        print("Recomputed, with indexes:")
+        indexed = time_queries(session_ids, args.queries,
+                               lambda s: scan_last_score(db, s), lambda s: scan_performance_stats(db, s))
+        print("From session_stats:")
+        after = time_queries(session_ids, args.queries, db.get_last_score, db.get_performance_stats)
+
+        print("Speedup over full scans (indexes / aggregates):")
+        for name in before:
+            print(f"  {name:<22} {before[name] / indexed[name]:9.1f}x {before[name] / after[name]:9.1f}x")
+
+        sample = random.sample(session_ids, min(args.queries, len(session_ids)))
+        same = all(
+            scan_last_score(db, s) == db.get_last_score(s)
+            and abs(scan_performance_stats(db, s)["average_score"] - db.get_performance_stats(s)["average_score"]) < 1e-6
+            for s in sample
+        )
+        print(f"Aggregates match recomputed stats: {same}")
+
+        pages = 0
+        start = time.perf_counter()
+        for session_id in sample:
+            cursor = None
+            while True:
+                page = db.get_quiz_history(session_id, limit=50, cursor=cursor)
+                pages += 1
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+        print(f"get_quiz_history       {(time.perf_counter() - start) / pages * 1000:9.3f} ms/page of 50 ({pages} pages)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
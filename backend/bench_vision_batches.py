@@ -0,0 +1,142 @@
+"""Benchmark for batched Gemini Vision PDF extraction against a local stub.
+
+The stub stands in for the Vision endpoint: it parses the PDF it is sent,
+sleeps --latency seconds per page (plus a --slow-every straggler) and returns
+each page's size and text layer, so no API key or network is needed. For the
+PDFs in --dir plus a synthetic scanned PDF (--synthetic pages of incompressible
+images, each page a different width so the order can be checked) compares:
+  - whole: the old extract_text_with_gemini, one inline upload of the file
+  - batched: VisionBatchExtractor, page batches under a concurrency limit
+and reports wall time, peak Python memory (tracemalloc), the most requests
+the stub saw in flight, and whether batched output keeps page order.
+
+Usage: python bench_vision_batches.py [--dir ../uploads] [--synthetic 40] [--pages-per-batch 5] [--concurrency 4] [--latency 0.2]
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from io import BytesIO
+
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import PyPDF2
+
+from services.vision_batcher import VISION_PROMPT, VisionBatchExtractor
+
+
+def describe_page(page):
+    return f"[{float(page.mediabox.width):g}x{float(page.mediabox.height):g}] {page.extract_text() or ''}"
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubVisionModel:
+    """Answers generate_content like GenerativeModel, from the PDF's text layer"""
+
+    def __init__(self, latency, slow_every=0):
+        self.latency = latency
+        self.slow_every = slow_every
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def generate_content(self, parts):
+        with self.lock:
+            self.in_flight += 1
+            self.calls += 1
+            call = self.calls
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            reader = PyPDF2.PdfReader(BytesIO(parts[0]["data"]))
+            delay = self.latency * len(reader.pages)
+            if self.slow_every and call % self.slow_every == 0:
+                delay *= 4
+            time.sleep(delay)
+            return StubResponse("\n\n".join(describe_page(page) for page in reader.pages))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def extract_whole(model, file_path):
+    """The pre-batching extract_text_with_gemini for PDFs"""
+    with open(file_path, "rb") as f:
+        content = f.read()
+    return model.generate_content([{"mime_type": "application/pdf", "data": content}, VISION_PROMPT]).text
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def page_texts(file_path):
+    with open(file_path, "rb") as f:
+        return [describe_page(page) for page in PyPDF2.PdfReader(f).pages]
+
+
+def synthetic_scan(num_pages, out_dir):
+    from PIL import Image
+    path = os.path.join(out_dir, f"synthetic-scan-{num_pages}.pdf")
+    pages = [Image.frombytes("L", (800 + i, 1000), os.urandom((800 + i) * 1000)) for i in range(num_pages)]
+    pages[0].save(path, save_all=True, append_images=pages[1:])
+    return path
+
+
+def main():
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "uploads")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=default_dir)
+    parser.add_argument("--synthetic", type=int, default=40, help="Pages in the synthetic scanned PDF (0 = skip)")
+    parser.add_argument("--pages-per-batch", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub seconds per page")
+    parser.add_argument("--slow-every", type=int, default=3, help="Every Nth stub call is 4x slower (0 = never)")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    pdfs = sorted(glob.glob(os.path.join(args.dir, "*.pdf")))
+    if args.synthetic:
+        pdfs.append(synthetic_scan(args.synthetic, tmp.name))
+    if not pdfs:
+        raise SystemExit(f"No PDFs found in {args.dir}")
+
+    print(f"{args.pages_per_batch} pages per batch, concurrency {args.concurrency}, stub latency {args.latency}s/page")
+    for path in pdfs:
+        pages = page_texts(path)
+        print(f"--- {os.path.basename(path)} ({len(pages)} pages, {os.path.getsize(path) / (1024 * 1024):.1f} MB) ---")
+
+        whole_model = StubVisionModel(args.latency, args.slow_every)
+        _, t_whole, mem_whole = measure(lambda: extract_whole(whole_model, path))
+
+        batch_model = StubVisionModel(args.latency, args.slow_every)
+        extractor = VisionBatchExtractor(lambda: batch_model, args.pages_per_batch, args.concurrency)
+        batches, t_batched, mem_batched = measure(lambda: list(extractor.iter_batches(path)))
+
+        expected = ["\n\n".join(pages[start:start + args.pages_per_batch])
+                    for start in range(0, len(pages), args.pages_per_batch)]
+        print(f"whole:   {t_whole:.3f}s, peak {mem_whole:.1f} MB")
+        print(f"batched: {t_batched:.3f}s, peak {mem_batched:.1f} MB, "
+              f"{batch_model.calls} requests, max {batch_model.max_in_flight} in flight")
+        print(f"Page order preserved: {batches == expected}")
+        print(f"Concurrency limit respected: {batch_model.max_in_flight <= args.concurrency}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
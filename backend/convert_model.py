@@ -0,0 +1,88 @@
+"""Export the local flan-t5 question generator for faster CPU inference.
+
+Writes an ONNX Runtime copy of the model (plus tokenizer) that the API loads
+with LOCAL_MODEL_BACKEND=onnx and LOCAL_MODEL_PATH=<output>. With --quantize
+the encoder/decoder graphs are also dynamically quantized to int8.
+Works for the stock model or the output of train_model.py.
+
+Needs: pip install 'optimum[onnxruntime]'
+
+Usage: python convert_model.py [--source google/flan-t5-base] [--output ./flan_t5_onnx] [--quantize]
+"""
+import argparse
+import os
+import shutil
+import time
+
+from transformers import AutoTokenizer
+
+# Configuration
+DEFAULT_SOURCE = "google/flan-t5-base"  # or "./fine_tuned_t5_quiz" from train_model.py
+DEFAULT_OUTPUT = "./flan_t5_onnx"
+SAMPLE_PROMPT = "Generate a quiz question about: Mitochondria produce ATP through oxidative phosphorylation."
+
+
+def directory_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / (1024 * 1024)
+
+
+def quantize(output_dir):
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    onnx_files = [f for f in os.listdir(output_dir) if f.endswith(".onnx")]
+    quantized_dir = output_dir + "_int8_tmp"
+    for onnx_file in onnx_files:
+        print(f"Quantizing {onnx_file}...")
+        quantizer = ORTQuantizer.from_pretrained(output_dir, file_name=onnx_file)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+
+    # Replace the fp32 graphs with the int8 ones under their original names so
+    # ORTModelForSeq2SeqLM.from_pretrained finds them without extra arguments
+    for onnx_file in onnx_files:
+        quantized_file = onnx_file.replace(".onnx", "_quantized.onnx")
+        shutil.move(os.path.join(quantized_dir, quantized_file), os.path.join(output_dir, onnx_file))
+    shutil.rmtree(quantized_dir, ignore_errors=True)
+
+
+def smoke_test(output_dir):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    tokenizer = AutoTokenizer.from_pretrained(output_dir)
+    model = ORTModelForSeq2SeqLM.from_pretrained(output_dir)
+    inputs = tokenizer(SAMPLE_PROMPT, return_tensors="pt")
+    start = time.perf_counter()
+    outputs = model.generate(**inputs, max_length=64)
+    elapsed = time.perf_counter() - start
+    print(f"Sample output ({elapsed:.2f}s): {tokenizer.decode(outputs[0], skip_special_tokens=True)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--quantize", action="store_true", help="Dynamically quantize the ONNX graphs to int8")
+    args = parser.parse_args()
+
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    print(f"Exporting {args.source} to ONNX...")
+    model = ORTModelForSeq2SeqLM.from_pretrained(args.source, export=True)
+    model.save_pretrained(args.output)
+    AutoTokenizer.from_pretrained(args.source).save_pretrained(args.output)
+    print(f"Exported model: {directory_size_mb(args.output):.0f} MB")
+
+    if args.quantize:
+        quantize(args.output)
+        print(f"Quantized model: {directory_size_mb(args.output):.0f} MB")
+
+    smoke_test(args.output)
+    print(f"Done. Run the API with LOCAL_MODEL_BACKEND=onnx LOCAL_MODEL_PATH={args.output}")
+
+
+if __name__ == "__main__":
+    main()
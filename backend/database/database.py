@@ -1,91 +1,141 @@
 import sqlite3
+import base64
+import hashlib
 import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 import uuid
 
+from database.migrations import apply_migrations
+
+
+def question_hash(question: Dict) -> str:
+    """Stable hash of a question's text, ignoring case and whitespace"""
+    text = " ".join(str(question.get("question", "")).lower().split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
 
 class Database:
-    def __init__(self, db_path: str = "quiz_data.db"):
+    def __init__(self, db_path: str = "quiz_data.db", pool_size: Optional[int] = None):
         self.db_path = db_path
+        self.pool_size = pool_size if pool_size is not None else int(os.getenv("DB_POOL_SIZE", "8"))
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._open_connections = 0
+        # Recent scores kept per session for the stats history
+        self.stats_window = int(os.getenv("SESSION_STATS_WINDOW", "50"))
         self.init_db()
-    
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
-    
+        """Open a new tuned connection (callers must close it themselves)"""
+        # cached_statements keeps compiled statements per connection, which
+        # pays off because pooled connections live for the whole process
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-16000")  # ~16MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            can_open = self._open_connections < self.pool_size
+            if can_open:
+                self._open_connections += 1
+
+        if can_open:
+            try:
+                return self.get_connection()
+            except Exception:
+                with self._pool_lock:
+                    self._open_connections -= 1
+                raise
+
+        # Pool exhausted: wait for another thread to hand a connection back
+        return self._pool.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection, committing on success and rolling back on error"""
+        if self.pool_size <= 0:
+            conn = self.get_connection()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            return
+
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close all idle pooled connections"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._pool_lock:
+                self._open_connections -= 1
+
     def init_db(self):
-        """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                image_path TEXT,
-                extracted_text TEXT,
-                topics TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Quizzes table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS quizzes (
-                quiz_id TEXT PRIMARY KEY,
-                session_id TEXT,
-                quiz_data TEXT,
-                quiz_type TEXT,
-                difficulty TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-            )
-        """)
-        
-        # Submissions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS submissions (
-                submission_id TEXT PRIMARY KEY,
-                quiz_id TEXT,
-                session_id TEXT,
-                score REAL,
-                results TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (quiz_id) REFERENCES quizzes(quiz_id),
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
-    
-    def create_session(self, image_path: str, extracted_text: str, topics: List[str]) -> str:
-        """Create a new session"""
+        """Initialize database tables and apply pending schema migrations"""
+        with self.connection() as conn:
+            apply_migrations(conn)
+
+    def create_session(self, image_path: str, extracted_text: str, topics: List[str],
+                       upload_hash: Optional[str] = None) -> str:
+        """Create a new session, taking a reference on its stored upload if any"""
         session_id = str(uuid.uuid4())
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO sessions (session_id, image_path, extracted_text, topics)
-            VALUES (?, ?, ?, ?)
-        """, (session_id, image_path, extracted_text, json.dumps(topics)))
-        
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO sessions (session_id, image_path, extracted_text, topics)
+                VALUES (?, ?, ?, ?)
+            """, (session_id, image_path, extracted_text, json.dumps(topics)))
+            if upload_hash:
+                conn.execute(
+                    "UPDATE uploads SET ref_count = ref_count + 1 WHERE sha256 = ?",
+                    (upload_hash,)
+                )
+
         return session_id
-    
-    def get_session(self, session_id: str) -> Optional[Dict]:
-        """Get session data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
+
+    def _fetch_session(self, conn: sqlite3.Connection, session_id: str) -> Optional[Dict]:
+        row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+
         if not row:
             return None
-        
+
         return {
             "session_id": row[0],
             "image_path": row[1],
@@ -93,117 +143,565 @@ class Database:
             "topics": json.loads(row[3]),
             "created_at": row[4]
         }
-    
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """Get session data"""
+        with self.connection() as conn:
+            return self._fetch_session(conn, session_id)
+
     def save_quiz(self, session_id: str, quiz_data: Dict, quiz_type: str) -> str:
         """Save quiz to database"""
         quiz_id = str(uuid.uuid4())
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO quizzes (quiz_id, session_id, quiz_data, quiz_type, difficulty)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            quiz_id,
-            session_id,
-            json.dumps(quiz_data),
-            quiz_type,
-            quiz_data.get("difficulty", "medium")
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO quizzes (quiz_id, session_id, quiz_data, quiz_type, difficulty)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                quiz_id,
+                session_id,
+                json.dumps(quiz_data),
+                quiz_type,
+                quiz_data.get("difficulty", "medium")
+            ))
+
         return quiz_id
-    
+
     def get_quiz(self, quiz_id: str) -> Optional[Dict]:
         """Get quiz data"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT quiz_data FROM quizzes WHERE quiz_id = ?", (quiz_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
+        with self.connection() as conn:
+            row = conn.execute("SELECT quiz_data FROM quizzes WHERE quiz_id = ?", (quiz_id,)).fetchone()
+
         if not row:
             return None
-        
+
         return json.loads(row[0])
-    
+
+    def get_quizzes(self, quiz_ids: List[str]) -> Dict[str, Dict]:
+        """Quiz data for several quizzes in one query, keyed by quiz_id; unknown ids are left out"""
+        quizzes = {}
+        with self.connection() as conn:
+            # Stay well under sqlite's bound-parameter limit
+            for start in range(0, len(quiz_ids), 500):
+                chunk = quiz_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT quiz_id, quiz_data FROM quizzes WHERE quiz_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                quizzes.update((quiz_id, json.loads(data)) for quiz_id, data in rows)
+        return quizzes
+
     def save_submission(self, quiz_id: str, session_id: str, score: float, results: List[Dict]):
-        """Save quiz submission"""
+        """Save quiz submission and fold its score into the session's stats"""
         submission_id = str(uuid.uuid4())
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO submissions (submission_id, quiz_id, session_id, score, results)
-            VALUES (?, ?, ?, ?, ?)
-        """, (submission_id, quiz_id, session_id, score, json.dumps(results)))
-        
-        conn.commit()
-        conn.close()
+        submitted_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO submissions (submission_id, quiz_id, session_id, score, results, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (submission_id, quiz_id, session_id, score, json.dumps(results), submitted_at))
+            self._record_scores(conn, session_id, [[score, submitted_at]])
+            self._record_topics(conn, [(session_id, results)])
+
         return submission_id
-    
+
+    def save_submissions(self, submissions: List[tuple]) -> List[str]:
+        """Save many (quiz_id, session_id, score, results) submissions in one transaction"""
+        submitted_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        rows = [
+            (str(uuid.uuid4()), quiz_id, session_id, score, json.dumps(results), submitted_at)
+            for quiz_id, session_id, score, results in submissions
+        ]
+        by_session: Dict[str, List[list]] = {}
+        for _, session_id, score, _ in submissions:
+            by_session.setdefault(session_id, []).append([score, submitted_at])
+
+        with self.connection() as conn:
+            conn.executemany("""
+                INSERT INTO submissions (submission_id, quiz_id, session_id, score, results, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            for session_id, scores in by_session.items():
+                self._record_scores(conn, session_id, scores)
+            self._record_topics(conn, [(session_id, results) for _, session_id, _, results in submissions])
+
+        return [row[0] for row in rows]
+
+    def _record_scores(self, conn: sqlite3.Connection, session_id: str, scores: List[list]):
+        """Update session_stats and session_daily_stats with [score, created_at] pairs, oldest first.
+
+        Callers insert the submissions first: that write takes the database
+        lock, so the row read here can't change before it is written back.
+        """
+        row = conn.execute("""
+            SELECT quiz_count, score_sum, min_score, max_score, recent_scores
+            FROM session_stats WHERE session_id = ?
+        """, (session_id,)).fetchone()
+        if row:
+            count, total, lowest, highest, recent = row[0], row[1], row[2], row[3], json.loads(row[4])
+        else:
+            count, total, lowest, highest, recent = 0, 0.0, None, None, []
+
+        values = [score for score, _ in scores]
+        count += len(values)
+        total += sum(values)
+        lowest = min(values) if lowest is None else min(lowest, *values)
+        highest = max(values) if highest is None else max(highest, *values)
+        recent = (recent + scores)[-self.stats_window:]
+
+        conn.execute("""
+            INSERT INTO session_stats
+                (session_id, quiz_count, score_sum, min_score, max_score, last_score, last_submitted_at, recent_scores)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                quiz_count = excluded.quiz_count, score_sum = excluded.score_sum,
+                min_score = excluded.min_score, max_score = excluded.max_score,
+                last_score = excluded.last_score, last_submitted_at = excluded.last_submitted_at,
+                recent_scores = excluded.recent_scores
+        """, (session_id, count, total, lowest, highest, scores[-1][0], scores[-1][1], json.dumps(recent)))
+
+        days: Dict[str, List[float]] = {}
+        for score, submitted_at in scores:
+            days.setdefault(submitted_at[:10], []).append(score)
+        conn.executemany("""
+            INSERT INTO session_daily_stats (session_id, day, quiz_count, score_sum, min_score, max_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id, day) DO UPDATE SET
+                quiz_count = quiz_count + excluded.quiz_count, score_sum = score_sum + excluded.score_sum,
+                min_score = MIN(min_score, excluded.min_score), max_score = MAX(max_score, excluded.max_score)
+        """, [(session_id, day, len(values), sum(values), min(values), max(values)) for day, values in days.items()])
+
+    def _record_topics(self, conn: sqlite3.Connection, graded: List[tuple]):
+        """Add (session_id, results) answers to the per-topic counters"""
+        counts: Dict[tuple, List[int]] = {}
+        for session_id, results in graded:
+            for result in results:
+                topic = result.get("topic")
+                if not topic:
+                    continue
+                counter = counts.setdefault((session_id, topic), [0, 0])
+                counter[0] += 1
+                counter[1] += 1 if result.get("is_correct") else 0
+
+        conn.executemany("""
+            INSERT INTO topic_stats (session_id, topic, attempts, correct)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_id, topic) DO UPDATE SET
+                attempts = attempts + excluded.attempts, correct = correct + excluded.correct
+        """, [(session_id, topic, attempts, correct) for (session_id, topic), (attempts, correct) in counts.items()])
+
+    def get_topic_stats(self, session_id: str) -> Dict[str, Dict]:
+        """Per-topic counters for a session's tested topics.
+
+        Returns ``topic_performance`` (percentage correct) and ``topic_attempts``,
+        both keyed by topic in the session's topic order.
+        """
+        with self.connection() as conn:
+            return self._fetch_topic_stats(conn, session_id)
+
+    def _fetch_topic_stats(self, conn: sqlite3.Connection, session_id: str,
+                           topics: Optional[List[str]] = None) -> Dict[str, Dict]:
+        if topics is None:
+            row = conn.execute("SELECT topics FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            topics = json.loads(row[0]) if row and row[0] else []
+        counters = {
+            topic: (attempts, correct)
+            for topic, attempts, correct in conn.execute(
+                "SELECT topic, attempts, correct FROM topic_stats WHERE session_id = ? AND attempts > 0",
+                (session_id,)
+            )
+        }
+
+        # Untested topics are left out; topics no longer listed go last
+        ordered = [topic for topic in topics if topic in counters]
+        listed = set(ordered)
+        ordered += [topic for topic in counters if topic not in listed]
+        return {
+            "topic_performance": {topic: counters[topic][1] / counters[topic][0] * 100 for topic in ordered},
+            "topic_attempts": {topic: counters[topic][0] for topic in ordered}
+        }
+
     def get_last_score(self, session_id: str) -> float:
         """Get last quiz score for a session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT score FROM submissions 
-            WHERE session_id = ? 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        """, (session_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT last_score FROM session_stats WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
         return row[0] if row else 50.0  # Default to 50% if no previous score
-    
-    def get_performance_stats(self, session_id: str) -> Optional[Dict]:
-        """Get performance statistics for a session"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Get all submissions
-        cursor.execute("""
-            SELECT score, created_at FROM submissions 
-            WHERE session_id = ? 
-            ORDER BY created_at
-        """, (session_id,))
-        
-        submissions = cursor.fetchall()
-        
-        if not submissions:
-            return None
-        
-        scores = [s[0] for s in submissions]
-        average_score = sum(scores) / len(scores)
-        
-        # Get session topics
-        session = self.get_session(session_id)
-        topics = session["topics"] if session else []
-        
-        # Calculate topic performance (simplified - average score per topic)
-        topic_performance = {topic: average_score for topic in topics}
-        
-        # Quiz history
-        quiz_history = [
+
+    def get_performance_stats(self, session_id: str, summary_only: bool = False) -> Optional[Dict]:
+        """Get performance statistics for a session from its maintained aggregates.
+
+        ``summary_only`` leaves quiz_history empty; get_quiz_history pages
+        through the full history.
+        """
+        with self.connection() as conn:
+            row = conn.execute("""
+                SELECT st.quiz_count, st.score_sum, st.min_score, st.max_score, st.last_score,
+                    st.recent_scores, s.topics
+                FROM session_stats st LEFT JOIN sessions s ON s.session_id = st.session_id
+                WHERE st.session_id = ?
+            """, (session_id,)).fetchone()
+
+            if not row or not row[0]:
+                return None
+
+            topics = json.loads(row[6]) if row[6] else []
+            topic_stats = self._fetch_topic_stats(conn, session_id, topics)
+
+        count, total, lowest, highest, last_score = row[0], row[1], row[2], row[3], row[4]
+        recent = json.loads(row[5])[-self.stats_window:]
+        average_score = total / count
+
+        # Quiz history: the rolling window of most recent quizzes, numbered
+        # from the session's first quiz
+        first_number = count - len(recent) + 1
+        quiz_history = [] if summary_only else [
             {
                 "score": score,
                 "date": date,
-                "quiz_number": i + 1
+                "quiz_number": first_number + i
             }
-            for i, (score, date) in enumerate(submissions)
+            for i, (score, date) in enumerate(recent)
         ]
-        
-        conn.close()
-        
+
         return {
             "session_id": session_id,
-            "total_quizzes": len(submissions),
+            "total_quizzes": count,
             "average_score": average_score,
-            "topic_performance": topic_performance,
+            "best_score": highest,
+            "lowest_score": lowest,
+            "last_score": last_score,
+            "recent_average": sum(score for score, _ in recent) / len(recent) if recent else last_score,
+            "topic_performance": topic_stats["topic_performance"],
+            "topic_attempts": topic_stats["topic_attempts"],
             "quiz_history": quiz_history
         }
+
+    def get_quiz_history(self, session_id: str, limit: int = 50, cursor: Optional[str] = None,
+                         since: Optional[str] = None) -> Dict:
+        """One page of a session's quiz history, newest first.
+
+        Pages follow (created_at, rowid) through the session/time index, so
+        each costs the same however long the history is; rowid keeps
+        same-second submissions in insert order, matching the numbering of
+        the /api/stats history. ``cursor`` is the ``next_cursor`` of the
+        previous page; ``since`` ("YYYY-MM-DD[ HH:MM:SS]", UTC) stops the
+        history there. Raises ValueError for a malformed cursor.
+        """
+        query = "SELECT created_at, rowid, score, quiz_id FROM submissions WHERE session_id = ?"
+        params: list = [session_id]
+        with self.connection() as conn:
+            if cursor:
+                created_at, row_id, number = self._decode_cursor(cursor)
+                query += " AND created_at <= ? AND (created_at < ? OR rowid < ?)"
+                params += [created_at, created_at, row_id]
+            else:
+                row = conn.execute(
+                    "SELECT quiz_count FROM session_stats WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                number = row[0] if row else 0
+            if since:
+                query += " AND created_at >= ?"
+                params.append(since)
+            query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+            # One extra row tells whether there is another page
+            params.append(limit + 1)
+            rows = conn.execute(query, params).fetchall()
+
+        items = [
+            {"score": score, "date": created_at, "quiz_number": number - i, "quiz_id": quiz_id}
+            for i, (created_at, _, score, quiz_id) in enumerate(rows[:limit])
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            created_at, row_id = rows[limit - 1][0], rows[limit - 1][1]
+            next_cursor = self._encode_cursor(created_at, row_id, number - limit)
+
+        return {"session_id": session_id, "items": items, "next_cursor": next_cursor}
+
+    def _encode_cursor(self, created_at: str, row_id: int, number: int) -> str:
+        raw = json.dumps([created_at, row_id, number]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> tuple:
+        try:
+            created_at, row_id, number = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            return str(created_at), int(row_id), int(number)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    def get_score_rollup(self, session_id: str, bucket: str = "day", since: Optional[str] = None,
+                         until: Optional[str] = None) -> List[Dict]:
+        """Quizzes and scores per UTC day or week (starting Monday), oldest first.
+
+        Read from session_daily_stats, so the cost grows with the number of
+        active days, not submissions. ``since``/``until`` are inclusive
+        "YYYY-MM-DD" dates.
+        """
+        if bucket == "week":
+            period = "date(day, 'weekday 0', '-6 days')"
+        elif bucket == "day":
+            period = "day"
+        else:
+            raise ValueError(f"Unknown bucket: {bucket}")
+
+        query = f"""
+            SELECT {period} AS period_start, SUM(quiz_count), SUM(score_sum), MIN(min_score), MAX(max_score)
+            FROM session_daily_stats WHERE session_id = ?
+        """
+        params: list = [session_id]
+        if since:
+            query += " AND day >= ?"
+            params.append(since[:10])
+        if until:
+            query += " AND day <= ?"
+            params.append(until[:10])
+        query += " GROUP BY period_start ORDER BY period_start"
+
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return [
+            {
+                "period_start": period_start,
+                "quizzes": quizzes,
+                "average_score": total / quizzes,
+                "min_score": lowest,
+                "max_score": highest
+            }
+            for period_start, quizzes, total, lowest, highest in rows
+        ]
+
+    def add_to_question_bank(self, session_id: str, questions: List[Dict], difficulty: str,
+                             bloom_level: str, question_type: str, served: bool = True) -> int:
+        """Store validated questions for reuse, skipping ones already banked for this session"""
+        rows = [
+            (
+                str(uuid.uuid4()),
+                session_id,
+                q.get("topic"),
+                difficulty,
+                bloom_level,
+                q.get("question_type", question_type),
+                question_hash(q),
+                json.dumps(q),
+                1 if served else 0
+            )
+            for q in questions
+        ]
+        with self.connection() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO question_bank
+                    (question_id, session_id, topic, difficulty, bloom_level, question_type,
+                     question_hash, question_data, times_served)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            return conn.total_changes - before
+
+    def sample_question_bank(self, session_id: str, question_type: str, difficulty: str,
+                             bloom_level: str, quotas: Dict[str, int],
+                             max_serves: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """Take up to ``quotas[topic]`` banked questions per topic and count them as served.
+
+        Questions this session has never been served come first, then the
+        least served, so repeating a request doesn't replay the same set.
+        """
+        query = """
+            SELECT question_id, question_data FROM question_bank
+            WHERE session_id = ? AND question_type = ? AND difficulty = ? AND topic = ?
+        """
+        params: list = [session_id, question_type, difficulty]
+        if bloom_level and bloom_level != "Mixed":
+            query += " AND bloom_level = ?"
+        if max_serves is not None:
+            query += " AND times_served < ?"
+        query += " ORDER BY times_served, RANDOM() LIMIT ?"
+
+        sampled: Dict[str, List[Dict]] = {}
+        with self.connection() as conn:
+            for topic, quota in quotas.items():
+                if quota <= 0:
+                    continue
+                topic_params = params + [topic]
+                if bloom_level and bloom_level != "Mixed":
+                    topic_params.append(bloom_level)
+                if max_serves is not None:
+                    topic_params.append(max_serves)
+                topic_params.append(quota)
+                rows = conn.execute(query, topic_params).fetchall()
+                conn.executemany(
+                    "UPDATE question_bank SET times_served = times_served + 1 WHERE question_id = ?",
+                    [(row[0],) for row in rows]
+                )
+                sampled[topic] = [json.loads(row[1]) for row in rows]
+
+        return sampled
+
+    def register_upload(self, sha256: str, path: str, size: int):
+        """Record a stored upload, refreshing last_used_at if it already exists"""
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO uploads (sha256, path, size, last_used_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET path = excluded.path, last_used_at = excluded.last_used_at
+            """, (sha256, path, size, time.time()))
+
+    def get_upload(self, sha256: str) -> Optional[Dict]:
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT sha256, path, size, ref_count, last_used_at FROM uploads WHERE sha256 = ?",
+                (sha256,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {"sha256": row[0], "path": row[1], "size": row[2], "ref_count": row[3], "last_used_at": row[4]}
+
+    def find_orphaned_uploads(self, unused_since: float) -> List[Dict]:
+        """Uploads no session references and no pending job will read, untouched since the cutoff"""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT sha256, path FROM uploads u
+                WHERE ref_count = 0 AND last_used_at < ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM jobs
+                    WHERE status IN ('queued', 'running') AND payload LIKE '%' || u.sha256 || '%'
+                )
+            """, (unused_since,)).fetchall()
+
+        return [{"sha256": row[0], "path": row[1]} for row in rows]
+
+    def delete_orphaned_upload(self, sha256: str, unused_since: float) -> bool:
+        """Drop an upload row if it is still unreferenced and stale; False if it came back into use"""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM uploads WHERE sha256 = ? AND ref_count = 0 AND last_used_at < ?",
+                (sha256, unused_since)
+            )
+            return cursor.rowcount > 0
+
+    def upload_stats(self) -> Dict:
+        with self.connection() as conn:
+            files, total_bytes, references, orphans = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(ref_count), 0),
+                    COALESCE(SUM(ref_count = 0), 0)
+                FROM uploads
+            """).fetchone()
+
+        return {"files": files, "size_bytes": total_bytes, "references": references, "unreferenced": orphans}
+
+    def create_job(self, job_type: str, payload: Dict) -> str:
+        """Enqueue a background job"""
+        job_id = str(uuid.uuid4())
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO jobs (job_id, job_type, status, stage, payload)
+                VALUES (?, ?, 'queued', 'queued', ?)
+            """, (job_id, job_type, json.dumps(payload)))
+
+        return job_id
+
+    def claim_next_job(self, worker_id: Optional[str] = None) -> Optional[Dict]:
+        """Atomically take the oldest queued job and mark it running under worker_id's lease"""
+        with self.connection() as conn:
+            # BEGIN IMMEDIATE takes the write lock so two workers can't claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""
+                SELECT job_id, job_type, payload FROM jobs
+                WHERE status = 'queued'
+                ORDER BY created_at, rowid
+                LIMIT 1
+            """).fetchone()
+            if row:
+                conn.execute("""
+                    UPDATE jobs SET status = 'running', stage = 'starting', worker_id = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE job_id = ?
+                """, (worker_id, row[0]))
+
+        if not row:
+            return None
+
+        return {
+            "job_id": row[0],
+            "job_type": row[1],
+            "payload": json.loads(row[2])
+        }
+
+    def update_job_progress(self, job_id: str, progress: int, stage: str):
+        """Record how far a running job has got"""
+        with self.connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET progress = ?, stage = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = ?
+            """, (progress, stage, job_id))
+
+    def finish_job(self, job_id: str, result: Optional[Dict] = None, error: Optional[str] = None,
+                   worker_id: Optional[str] = None) -> bool:
+        """Mark a job completed with its result, or failed with an error.
+
+        With worker_id, only while that worker still holds the job: False if
+        its lease expired and the job was requeued meanwhile.
+        """
+        owner = ""
+        params: list = []
+        if worker_id is not None:
+            owner = " AND status = 'running' AND worker_id = ?"
+            params.append(worker_id)
+        with self.connection() as conn:
+            if error is None:
+                cursor = conn.execute("""
+                    UPDATE jobs SET status = 'completed', progress = 100, stage = 'done',
+                        result = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE job_id = ?""" + owner, [json.dumps(result), job_id] + params)
+            else:
+                cursor = conn.execute("""
+                    UPDATE jobs SET status = 'failed', stage = 'failed',
+                        error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE job_id = ?""" + owner, [error, job_id] + params)
+            return cursor.rowcount > 0
+
+    def heartbeat_jobs(self, worker_id: str) -> int:
+        """Renew the lease on every job worker_id is running"""
+        with self.connection() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND worker_id = ?
+            """, (worker_id,))
+            return cursor.rowcount
+
+    def requeue_expired_jobs(self, lease_seconds: float) -> int:
+        """Put running jobs whose worker stopped heartbeating (crash, restart) back on the queue"""
+        with self.connection() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = 'queued', stage = 'requeued', progress = 0, worker_id = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND updated_at < datetime('now', ?)
+            """, (f"-{lease_seconds} seconds",))
+            return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get job status and result"""
+        with self.connection() as conn:
+            row = conn.execute("""
+                SELECT job_id, job_type, status, progress, stage, result, error, created_at, updated_at
+                FROM jobs WHERE job_id = ?
+            """, (job_id,)).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            "job_id": row[0],
+            "job_type": row[1],
+            "status": row[2],
+            "progress": row[3],
+            "stage": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8]
+        }
@@ -0,0 +1,262 @@
+"""Versioned schema migrations for the sqlite database.
+
+The applied version is stored in ``PRAGMA user_version``. Each migration is a
+list of SQL statements or callables taking the connection, and runs inside a
+single transaction so a half-applied migration never sticks. To change the
+schema, append a new entry with the next version number; never edit one that
+has already shipped.
+"""
+import json
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+# Recent scores kept per session when backfilling; writes trim to SESSION_STATS_WINDOW
+BACKFILL_WINDOW = 50
+
+
+def backfill_session_stats(conn: sqlite3.Connection):
+    """Rebuild session_stats from the submissions table in one ordered pass"""
+    conn.execute("DELETE FROM session_stats")
+    rows = conn.execute("""
+        SELECT session_id, score, created_at FROM submissions
+        ORDER BY session_id, created_at, rowid
+    """)
+
+    def flush(session_id, scores):
+        conn.execute("""
+            INSERT INTO session_stats
+                (session_id, quiz_count, score_sum, min_score, max_score, last_score, last_submitted_at, recent_scores)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            session_id, len(scores), sum(score for score, _ in scores),
+            min(score for score, _ in scores), max(score for score, _ in scores),
+            scores[-1][0], scores[-1][1], json.dumps(scores[-BACKFILL_WINDOW:])
+        ))
+
+    current, scores = None, []
+    for session_id, score, created_at in rows:
+        if session_id != current:
+            if scores:
+                flush(current, scores)
+            current, scores = session_id, []
+        scores.append([score, created_at])
+    if scores:
+        flush(current, scores)
+
+
+def backfill_topic_stats(conn: sqlite3.Connection):
+    """Rebuild topic_stats from stored results, using each quiz's question topics"""
+    conn.execute("DELETE FROM topic_stats")
+    rows = conn.execute("""
+        SELECT s.session_id, s.results, q.quiz_data FROM submissions s
+        JOIN quizzes q ON q.quiz_id = s.quiz_id
+        ORDER BY s.quiz_id
+    """)
+
+    counts = {}
+    for session_id, results, quiz_data in rows:
+        questions = json.loads(quiz_data).get("questions", [])
+        for result in json.loads(results or "[]"):
+            index = result.get("question_index")
+            topic = result.get("topic")
+            if topic is None and isinstance(index, int) and 0 <= index < len(questions):
+                topic = questions[index].get("topic")
+            if not topic:
+                continue
+            counter = counts.setdefault((session_id, topic), [0, 0])
+            counter[0] += 1
+            counter[1] += 1 if result.get("is_correct") else 0
+
+    conn.executemany(
+        "INSERT INTO topic_stats (session_id, topic, attempts, correct) VALUES (?, ?, ?, ?)",
+        [(session_id, topic, attempts, correct) for (session_id, topic), (attempts, correct) in counts.items()]
+    )
+
+
+MIGRATIONS: List[Tuple[int, str, List[MigrationStep]]] = [
+    (1, "base schema", [
+        # Statements use IF NOT EXISTS so databases created before migrations
+        # existed (user_version 0) are adopted in place
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            image_path TEXT,
+            extracted_text TEXT,
+            topics TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS quizzes (
+            quiz_id TEXT PRIMARY KEY,
+            session_id TEXT,
+            quiz_data TEXT,
+            quiz_type TEXT,
+            difficulty TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS submissions (
+            submission_id TEXT PRIMARY KEY,
+            quiz_id TEXT,
+            session_id TEXT,
+            score REAL,
+            results TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (quiz_id) REFERENCES quizzes(quiz_id),
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            job_type TEXT,
+            status TEXT,
+            progress INTEGER DEFAULT 0,
+            stage TEXT,
+            payload TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "session/created_at indexes", [
+        # Covers get_last_score and the stats history scan without touching the table
+        "CREATE INDEX IF NOT EXISTS idx_submissions_session_created ON submissions(session_id, created_at, score)",
+        "CREATE INDEX IF NOT EXISTS idx_quizzes_session_created ON quizzes(session_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)",
+    ]),
+    (3, "question bank", [
+        """
+        CREATE TABLE IF NOT EXISTS question_bank (
+            question_id TEXT PRIMARY KEY,
+            session_id TEXT,
+            topic TEXT,
+            difficulty TEXT,
+            bloom_level TEXT,
+            question_type TEXT,
+            question_hash TEXT,
+            question_data TEXT,
+            times_served INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (session_id, question_hash),
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_question_bank_lookup ON question_bank(session_id, question_type, difficulty, times_served)",
+    ]),
+    (4, "content-addressed uploads", [
+        """
+        CREATE TABLE IF NOT EXISTS uploads (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT,
+            size INTEGER,
+            ref_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_uploads_orphans ON uploads(ref_count, last_used_at)",
+    ]),
+    (5, "session stats aggregates", [
+        # Maintained by save_submission(s) in the same transaction as the
+        # submission rows; recent_scores is a JSON list of [score, created_at]
+        """
+        CREATE TABLE IF NOT EXISTS session_stats (
+            session_id TEXT PRIMARY KEY,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            min_score REAL,
+            max_score REAL,
+            last_score REAL,
+            last_submitted_at TIMESTAMP,
+            recent_scores TEXT NOT NULL DEFAULT '[]',
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        backfill_session_stats,
+    ]),
+    (6, "topic stats", [
+        # Per-topic answer counters, maintained by save_submission(s) from
+        # the topic each graded result carries
+        """
+        CREATE TABLE IF NOT EXISTS topic_stats (
+            session_id TEXT,
+            topic TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, topic),
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        backfill_topic_stats,
+    ]),
+    (7, "history pagination and daily rollups", [
+        # Cursor pages walk (created_at, rowid): created_at has one-second
+        # resolution and a batch shares one value, so ties break by insert
+        # order, which every index entry already ends with. Replaces the
+        # migration 2 index, whose trailing score column would interleave
+        # same-second rows by score instead
+        "CREATE INDEX IF NOT EXISTS idx_submissions_session_time ON submissions(session_id, created_at)",
+        "DROP INDEX IF EXISTS idx_submissions_session_created",
+        # One row per session and UTC day, maintained alongside session_stats
+        """
+        CREATE TABLE IF NOT EXISTS session_daily_stats (
+            session_id TEXT,
+            day TEXT,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            min_score REAL,
+            max_score REAL,
+            PRIMARY KEY (session_id, day),
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO session_daily_stats (session_id, day, quiz_count, score_sum, min_score, max_score)
+        SELECT session_id, date(created_at), COUNT(*), SUM(score), MIN(score), MAX(score)
+        FROM submissions GROUP BY session_id, date(created_at)
+        """,
+    ]),
+    (8, "job leases", [
+        # The worker holding a running job; it refreshes updated_at as a
+        # heartbeat, and only jobs whose heartbeat stopped are requeued
+        "ALTER TABLE jobs ADD COLUMN worker_id TEXT",
+    ]),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Bring the database up to the latest version, returns the resulting version"""
+    for version, name, steps in MIGRATIONS:
+        # Take the write lock before checking the version so concurrent
+        # workers starting at the same time don't apply a migration twice
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                continue
+
+            print(f"Applying database migration {version}: {name}")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return get_schema_version(conn)
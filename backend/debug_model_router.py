@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.model_router import ModelRouter
+
+
+class FakeRateLimit(Exception):
+    pass
+
+
+class FakeGeminiModel:
+    """Local stand-in for genai.GenerativeModel with configurable latency and failures"""
+
+    def __init__(self, name, latency=0.05, fail_every=0, rate_limited=False):
+        self.name = name
+        self.latency = latency
+        self.fail_every = fail_every
+        self.rate_limited = rate_limited
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.rate_limited:
+            raise FakeRateLimit("429 quota exceeded")
+        if self.fail_every and self.calls % self.fail_every != 0:
+            raise RuntimeError("500 internal error")
+        return type("Response", (), {"text": f'["answer from {self.name}"]'})()
+
+
+def test():
+    fakes = {
+        "models/degraded": FakeGeminiModel("models/degraded", latency=0.2, fail_every=5),
+        "models/quota": FakeGeminiModel("models/quota", rate_limited=True),
+        "models/slow": FakeGeminiModel("models/slow", latency=0.12),
+        "models/fast": FakeGeminiModel("models/fast", latency=0.02),
+    }
+    router = ModelRouter(
+        list(fakes),
+        model_factory=lambda name: fakes[name],
+        rate_limit_errors=(FakeRateLimit,),
+        failure_threshold=2,
+        open_seconds=1.0
+    )
+
+    def attempt(model, model_name):
+        return model.generate_content("prompt").text
+
+    print("--- 30 requests through the router ---")
+    start = time.perf_counter()
+    served_by = {}
+    for i in range(30):
+        result = router.call(attempt)
+        served_by[result] = served_by.get(result, 0) + 1
+    elapsed = time.perf_counter() - start
+    print(f"Total time: {elapsed:.2f}s ({elapsed / 30 * 1000:.0f} ms/request)")
+    print(f"Served by: {served_by}")
+    print(f"Calls per model: { {name: fake.calls for name, fake in fakes.items()} }")
+
+    print("--- Model health ---")
+    for entry in router.stats():
+        print(entry)
+
+    if served_by.get('["answer from models/fast"]', 0) >= 15:
+        print("ROUTER IS WORKING: traffic converged on the fastest healthy model.")
+    else:
+        print("ROUTER DID NOT CONVERGE on the fastest model.")
+
+
+if __name__ == "__main__":
+    test()
@@ -1,24 +1,33 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-import shutil
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Optional
 import json
 from datetime import datetime
 
-from services.ocr_service import OCRService
+from services.ocr_service import OCRService, extract_topics_from_text
 from services.quiz_generator import QuizGenerator
 from services.adaptive_quiz import AdaptiveQuizService
+from services.worker_pool import ExecutorService, PoolSaturatedError
+from services.job_queue import JobQueue
+from services.question_bank import QuestionBankService
+from services.upload_store import UploadStore, UploadRejectedError
+from services.grading import GradingService
 from database.database import Database
 from models.schemas import (
     UploadResponse, TopicListResponse, QuizRequest, 
     QuizResponse, QuizSubmission, SubmissionResponse,
-    PerformanceStats, TextRequest, ParseQuizRequest
+    PerformanceStats, TextRequest, ParseQuizRequest,
+    QuizJobRequest, JobResponse, JobStatusResponse,
+    BatchSubmission, BatchSubmissionItem, BatchSubmissionResponse,
+    QuizHistoryPage, ScoreRollup
 )
 
 app = FastAPI(title="Syllabus to Quiz API")
@@ -33,13 +42,265 @@ app.add_middleware(
 )
 
 # Initialize services (OCR is lazy-loaded to avoid SSL issues at startup)
-ocr_service = OCRService()
+executor = ExecutorService()
+ocr_service = OCRService(executor)
 quiz_generator = QuizGenerator()
 adaptive_service = AdaptiveQuizService()
 db = Database()
+job_queue = JobQueue(db)
+question_bank = QuestionBankService(db, quiz_generator)
+grading = GradingService(db)
+GRADING_MAX_BATCH = int(os.getenv("GRADING_MAX_BATCH", "500"))
+STATS_HISTORY_MAX_PAGE = int(os.getenv("STATS_HISTORY_MAX_PAGE", "200"))
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+upload_store = UploadStore(db, UPLOAD_DIR)
+UPLOAD_GC_INTERVAL = float(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "3600"))
+
+# Heavy clients load in a background thread after startup; /readyz reports when done
+WARMUP_LOCAL_MODELS = os.getenv("WARMUP_LOCAL_MODELS", "false").lower() in ("1", "true", "yes")
+warmup_done = threading.Event()
+
+
+async def run_io(func, *args, **kwargs):
+    """Run slow blocking work (OCR, Gemini, file writes) on the I/O pool"""
+    try:
+        return await executor.run_io(func, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Run CPU-bound work (regex parsing of client text) on the process pool"""
+    try:
+        return await executor.run_cpu(func, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def run_db(func, *args, **kwargs):
+    """Run sqlite work on the database pool"""
+    try:
+        return await executor.run_db(func, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def store_upload(file: UploadFile) -> Dict:
+    """Stream an upload into the content-addressed store, enforcing size and type limits"""
+    try:
+        return await run_io(upload_store.save, file.file, file.filename)
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+UPLOAD_PATHS = {"/api/upload", "/api/parse-quiz-file", "/api/jobs/upload"}
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Answer 413 from the Content-Length header before the multipart body is read"""
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        try:
+            upload_store.check_declared_size(int(content_length) if content_length else None)
+        except UploadRejectedError as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": str(e)})
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+    return await call_next(request)
+
+
+def _no_progress(progress: int, stage: str):
+    pass
+
+
+def process_upload(file_path: str, report_progress=_no_progress, upload_hash: Optional[str] = None) -> Dict:
+    """OCR -> topic extraction -> session pipeline for an uploaded file"""
+    # Extract text using OCR/PDF (the store's content hash doubles as the cache key)
+    report_progress(10, "extracting_text")
+    extracted_text = ocr_service.extract_text(file_path, upload_hash)
+    
+    # Extract topics intelligently using AI
+    report_progress(50, "extracting_topics")
+    topics = quiz_generator.extract_topics(extracted_text)
+    
+    # Fallback to OCR service regex logic if AI failed
+    if not topics:
+        topics = ocr_service.extract_topics(extracted_text)
+    
+    # Store in database
+    report_progress(90, "saving_session")
+    session_id = db.create_session(file_path, extracted_text, topics, upload_hash)
+    
+    return {"session_id": session_id, "topics": topics}
+
+
+def choose_difficulty(session_id: str, adaptive: bool):
+    """Return (difficulty, quiz_type) for the next quiz in a session"""
+    if adaptive:
+        # Base difficulty on previous quiz performance
+        difficulty = adaptive_service.determine_difficulty(db.get_last_score(session_id))
+        return difficulty, f"adaptive_{difficulty}"
+    return "medium", "initial"
+
+
+def focus_session(session: Dict, adaptive: bool) -> Dict:
+    """For adaptive quizzes, a copy of the session with weak topics first and marked for the bank"""
+    if not adaptive:
+        return session
+    topic_stats = db.get_topic_stats(session["session_id"])
+    performance, attempts = topic_stats["topic_performance"], topic_stats["topic_attempts"]
+    topics = adaptive_service.prioritize_topics(session["topics"], performance, attempts)
+    weak_topics = [t for t in adaptive_service.weak_topics(performance, attempts) if t in topics]
+    if weak_topics:
+        print(f"Targeting weak topics: {weak_topics[:5]}")
+    return {**session, "topics": topics, "weak_topics": weak_topics}
+
+
+def create_quiz(session_id: str, num_questions: int, bloom_level: str, question_type: str,
+                adaptive: bool = False, report_progress=_no_progress) -> Optional[Dict]:
+    """Generate and store a quiz for a session, returns None if the session doesn't exist"""
+    report_progress(5, "loading_session")
+    session = db.get_session(session_id)
+    if not session:
+        return None
+    
+    difficulty, quiz_type = choose_difficulty(session_id, adaptive)
+    session = focus_session(session, adaptive)
+    
+    # Reuse banked questions and generate only the missing ones
+    report_progress(20, "generating_questions")
+    quiz = question_bank.assemble_quiz(
+        session,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        bloom_level=bloom_level,
+        question_type=question_type
+    )
+    
+    # Store quiz in database
+    report_progress(90, "saving_quiz")
+    quiz_id = db.save_quiz(session_id, quiz, quiz_type)
+    
+    return {
+        "quiz_id": quiz_id,
+        "questions": quiz["questions"],
+        "session_id": session_id
+    }
+
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_quiz_events(session: Dict, num_questions: int, bloom_level: str, question_type: str,
+                       adaptive: bool = False):
+    """Server-Sent Events for a quiz: one event per question, then the stored quiz id"""
+    session_id = session["session_id"]
+    difficulty, quiz_type = choose_difficulty(session_id, adaptive)
+    session = focus_session(session, adaptive)
+    
+    questions = []
+    for q in question_bank.stream_quiz(session, num_questions, difficulty, bloom_level, question_type):
+        yield sse_event("question", {"index": len(questions), "question": q})
+        questions.append(q)
+    
+    if not questions:
+        yield sse_event("error", {"detail": "Could not generate any questions"})
+        return
+    
+    quiz = {
+        "questions": questions,
+        "difficulty": difficulty,
+        "bloom_level": bloom_level,
+        "question_type": question_type,
+        "topic_count": len(session["topics"])
+    }
+    quiz_id = db.save_quiz(session_id, quiz, quiz_type)
+    yield sse_event("done", {"quiz_id": quiz_id, "session_id": session_id, "count": len(questions)})
+
+
+async def iterate_on_io_pool(iterator):
+    """Drive a blocking iterator from the I/O pool one item at a time"""
+    sentinel = object()
+    while True:
+        try:
+            item = await executor.run_io(next, iterator, sentinel)
+        except Exception as e:  # PoolSaturatedError included
+            yield sse_event("error", {"detail": str(e)})
+            return
+        if item is sentinel:
+            return
+        yield item
+
+
+def run_upload_job(payload: Dict, report_progress) -> Dict:
+    return process_upload(payload["file_path"], report_progress, payload.get("upload_hash"))
+
+
+def run_generate_quiz_job(payload: Dict, report_progress) -> Dict:
+    result = create_quiz(
+        payload["session_id"],
+        payload["num_questions"],
+        payload["bloom_level"],
+        payload["question_type"],
+        adaptive=payload.get("adaptive", False),
+        report_progress=report_progress
+    )
+    if result is None:
+        raise ValueError("Session not found")
+    return result
+
+
+job_queue.register("upload", run_upload_job)
+job_queue.register("generate_quiz", run_generate_quiz_job)
+
+
+def warm_up_services():
+    """Resolve Gemini models (and optionally load T5/EasyOCR) off the startup path"""
+    try:
+        quiz_generator.warm_up()
+        ocr_service.warm_up(load_reader=WARMUP_LOCAL_MODELS)
+        if WARMUP_LOCAL_MODELS:
+            quiz_generator._init_local_model()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+    finally:
+        warmup_done.set()
+        print("Warm-up complete")
+
+
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.start()
+
+
+@app.on_event("startup")
+def start_warm_up():
+    threading.Thread(target=warm_up_services, name="warm-up", daemon=True).start()
+
+
+def collect_upload_orphans_forever():
+    while True:
+        try:
+            upload_store.collect_orphans()
+        except Exception as e:
+            print(f"Upload cleanup failed: {e}")
+        time.sleep(UPLOAD_GC_INTERVAL)
+
+
+@app.on_event("startup")
+def start_upload_gc():
+    if UPLOAD_GC_INTERVAL > 0:
+        threading.Thread(target=collect_upload_orphans_forever, name="upload-gc", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    job_queue.stop()
+    executor.shutdown()
 
 
 @app.post("/api/upload", response_model=UploadResponse)
@@ -47,28 +308,18 @@ async def upload_file(file: UploadFile = File(...)):
     """Upload syllabus image/PDF and extract topics"""
     try:
         # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await store_upload(file)
         
-        # Extract text using OCR/PDF
-        extracted_text = ocr_service.extract_text(str(file_path))
-        
-        # Extract topics intelligently using AI
-        topics = quiz_generator.extract_topics(extracted_text)
-        
-        # Fallback to OCR service regex logic if AI failed
-        if not topics:
-            topics = ocr_service.extract_topics(extracted_text)
-        
-        # Store in database
-        session_id = db.create_session(str(file_path), extracted_text, topics)
+        # Extract text, topics and store the session
+        result = await run_io(process_upload, stored["path"], _no_progress, stored["sha256"])
         
         return UploadResponse(
-            session_id=session_id,
+            session_id=result["session_id"],
             message="File uploaded and processed successfully",
-            topics=topics
+            topics=result["topics"]
         )
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -78,20 +329,22 @@ async def process_text(request: TextRequest):
     """Process direct syllabus text and extract topics"""
     try:
         # Extract topics intelligently using AI
-        topics = quiz_generator.extract_topics(request.text)
+        topics = await run_io(quiz_generator.extract_topics, request.text)
         
         # Fallback to OCR service regex logic if AI failed
         if not topics:
-            topics = ocr_service.extract_topics(request.text)
+            topics = await run_cpu(extract_topics_from_text, request.text)
             
         # Store session (use placeholder path for direct text)
-        session_id = db.create_session("direct_text", request.text, topics)
+        session_id = await run_db(db.create_session, "direct_text", request.text, topics)
         
         return UploadResponse(
             session_id=session_id,
             message="Text processed successfully",
             topics=topics
         )
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -101,16 +354,16 @@ async def parse_quiz(request: ParseQuizRequest):
     """Parse existing questions from text"""
     try:
         # Create a session for this parsed content
-        session_id = db.create_session("parsed_content", request.text, ["Parsed Questions"])
+        session_id = await run_db(db.create_session, "parsed_content", request.text, ["Parsed Questions"])
         
         # Parse questions using AI
-        quiz = quiz_generator.parse_questions_from_text(request.text)
+        quiz = await run_io(quiz_generator.parse_questions_from_text, request.text)
         
         if not quiz or not quiz.get("questions"):
             raise HTTPException(status_code=400, detail="Could not parse any questions from the provided text.")
             
         # Store quiz in database
-        quiz_id = db.save_quiz(session_id, quiz, "parsed")
+        quiz_id = await run_db(db.save_quiz, session_id, quiz, "parsed")
         
         return QuizResponse(
             quiz_id=quiz_id,
@@ -128,27 +381,25 @@ async def parse_quiz_file(file: UploadFile = File(...)):
     """Parse questions from uploaded file (PDF/Image)"""
     try:
         # Save uploaded file
-        file_path = UPLOAD_DIR / f"parse_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await store_upload(file)
         
         # Extract text using OCR/PDF
-        extracted_text = ocr_service.extract_text(str(file_path))
+        extracted_text = await run_io(ocr_service.extract_text, stored["path"], stored["sha256"])
         
         if not extracted_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract any text from the uploaded file.")
             
         # Create a session for this parsed content
-        session_id = db.create_session(str(file_path), extracted_text, ["Parsed Questions"])
+        session_id = await run_db(db.create_session, stored["path"], extracted_text, ["Parsed Questions"], stored["sha256"])
         
         # Parse questions using AI
-        quiz = quiz_generator.parse_questions_from_text(extracted_text)
+        quiz = await run_io(quiz_generator.parse_questions_from_text, extracted_text)
         
         if not quiz or not quiz.get("questions"):
             raise HTTPException(status_code=400, detail="Could not parse any questions from the extracted text.")
             
         # Store quiz in database
-        quiz_id = db.save_quiz(session_id, quiz, "parsed")
+        quiz_id = await run_db(db.save_quiz, session_id, quiz, "parsed")
         
         return QuizResponse(
             quiz_id=quiz_id,
@@ -164,7 +415,7 @@ async def parse_quiz_file(file: UploadFile = File(...)):
 @app.get("/api/topics/{session_id}", response_model=TopicListResponse)
 async def get_topics(session_id: str):
     """Get topics for a session"""
-    session = db.get_session(session_id)
+    session = await run_db(db.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -175,98 +426,88 @@ async def get_topics(session_id: str):
 async def generate_quiz(request: QuizRequest):
     """Generate initial quiz based on topics"""
     try:
-        session = db.get_session(request.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Generate quiz with context, bloom level and question type
-        quiz = quiz_generator.generate_quiz(
-            topics=session["topics"],
-            context=session.get("extracted_text", ""),
+        quiz = await run_io(
+            create_quiz,
+            request.session_id,
             num_questions=request.num_questions or 18,
-            difficulty="medium",
             bloom_level=request.bloom_level or "Mixed",
             question_type=request.question_type or "mcq"
         )
+        if quiz is None:
+            raise HTTPException(status_code=404, detail="Session not found")
         
-        # Store quiz in database
-        quiz_id = db.save_quiz(request.session_id, quiz, "initial")
-        
-        return QuizResponse(
-            quiz_id=quiz_id,
-            questions=quiz["questions"],
-            session_id=request.session_id
-        )
+        return QuizResponse(**quiz)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/generate-quiz/stream")
+async def generate_quiz_stream(request: QuizRequest, adaptive: bool = False):
+    """Stream quiz questions as Server-Sent Events as soon as each one is ready"""
+    session = await run_db(db.get_session, request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    events = stream_quiz_events(
+        session,
+        num_questions=request.num_questions or 18,
+        bloom_level=request.bloom_level or "Mixed",
+        question_type=request.question_type or "mcq",
+        adaptive=adaptive
+    )
+    return StreamingResponse(
+        iterate_on_io_pool(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/submit-quiz", response_model=SubmissionResponse)
 async def submit_quiz(submission: QuizSubmission):
     """Submit quiz answers and get results"""
     try:
-        quiz = db.get_quiz(submission.quiz_id)
-        if not quiz:
+        # Graded against the quiz's cached, precompiled answer key; the
+        # response is built before the submission is saved
+        response = await run_db(
+            grading.submit, submission.quiz_id, submission.session_id, submission.answers,
+            build=lambda graded: SubmissionResponse(**graded)
+        )
+        if response is None:
             raise HTTPException(status_code=404, detail="Quiz not found")
         
-        # Calculate score
-        correct = 0
-        total = len(quiz["questions"])
-        results = []
-        
-        for i, question in enumerate(quiz["questions"]):
-            user_answer = submission.answers.get(str(i))
-            correct_answer = question["correct_answer"]
-            q_type = question.get("question_type", "mcq")
-            
-            is_correct = False
-            
-            if q_type == "mcq":
-                is_correct = (str(user_answer) == str(correct_answer))
-            elif q_type == "fill_ups":
-                # Exact or very close keyword match (case-insensitive)
-                if isinstance(user_answer, str) and isinstance(correct_answer, str):
-                    is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
-            elif q_type == "short_answer":
-                # Check if user answer contains most of the key keywords
-                if isinstance(user_answer, str) and isinstance(correct_answer, str):
-                    keywords = [k.strip().lower() for k in correct_answer.split(",")]
-                    user_val = user_answer.lower()
-                    matches = [k for k in keywords if k in user_val]
-                    # If at least 50% of keywords match, we count it as correct for this simple implementation
-                    # Or at least one if it's very specific
-                    is_correct = len(matches) >= (len(keywords) + 1) // 2
-            
-            if is_correct:
-                correct += 1
-            
-            results.append({
-                "question_index": i,
-                "user_answer": user_answer,
-                "correct_answer": correct_answer,
-                "is_correct": is_correct
-            })
-        
-        score_percentage = (correct / total) * 100
-        
-        # Save submission
-        db.save_submission(
-            submission.quiz_id,
-            submission.session_id,
-            score_percentage,
-            results
+        return response
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/submit-quizzes", response_model=BatchSubmissionResponse)
+async def submit_quizzes(batch: BatchSubmission):
+    """Grade many submissions in one call; each item reports its own result or error"""
+    if len(batch.submissions) > GRADING_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {GRADING_MAX_BATCH} submissions per batch")
+    try:
+        outcomes = await run_db(
+            grading.submit_many, [s.model_dump() for s in batch.submissions],
+            build=lambda graded: SubmissionResponse(**graded)
         )
         
-        # Determine difficulty for next quiz
-        difficulty = "easy" if score_percentage < 60 else "hard" if score_percentage >= 80 else "medium"
+        items = []
+        for submission, outcome in zip(batch.submissions, outcomes):
+            item = BatchSubmissionItem(quiz_id=submission.quiz_id, session_id=submission.session_id)
+            if isinstance(outcome, SubmissionResponse):
+                item.result = outcome
+            else:
+                item.error = outcome["error"]
+            items.append(item)
         
-        return SubmissionResponse(
-            score=score_percentage,
-            correct=correct,
-            total=total,
-            results=results,
-            next_difficulty=difficulty
-        )
+        failed = sum(1 for item in items if item.error)
+        return BatchSubmissionResponse(graded=len(items) - failed, failed=failed, items=items)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -275,53 +516,142 @@ async def submit_quiz(submission: QuizSubmission):
 async def generate_adaptive_quiz(request: QuizRequest):
     """Generate adaptive quiz based on previous performance"""
     try:
-        session = db.get_session(request.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Get previous quiz performance
-        previous_score = db.get_last_score(request.session_id)
-        
-        # Determine difficulty
-        if previous_score < 60:
-            difficulty = "easy"
-        elif previous_score >= 80:
-            difficulty = "hard"
-        else:
-            difficulty = "medium"
-        
-        # Generate adaptive quiz with context, bloom level and question type
-        quiz = quiz_generator.generate_quiz(
-            topics=session["topics"],
-            context=session.get("extracted_text", ""),
+        quiz = await run_io(
+            create_quiz,
+            request.session_id,
             num_questions=request.num_questions or 18,
-            difficulty=difficulty,
             bloom_level=request.bloom_level or "Mixed",
-            question_type=request.question_type or "mcq"
+            question_type=request.question_type or "mcq",
+            adaptive=True
         )
+        if quiz is None:
+            raise HTTPException(status_code=404, detail="Session not found")
         
-        # Store quiz
-        quiz_id = db.save_quiz(request.session_id, quiz, f"adaptive_{difficulty}")
-        
-        return QuizResponse(
-            quiz_id=quiz_id,
-            questions=quiz["questions"],
-            session_id=request.session_id
-        )
+        return QuizResponse(**quiz)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/stats/{session_id}", response_model=PerformanceStats)
-async def get_stats(session_id: str):
-    """Get performance statistics for a session"""
-    stats = db.get_performance_stats(session_id)
+async def get_stats(session_id: str, summary: bool = False):
+    """Get performance statistics for a session (summary=true leaves out the recent history)"""
+    stats = await run_db(db.get_performance_stats, session_id, summary)
     if not stats:
         raise HTTPException(status_code=404, detail="No stats found")
     
+    stats["weak_topics"] = adaptive_service.weak_topics(stats["topic_performance"], stats["topic_attempts"])
     return PerformanceStats(**stats)
 
 
+@app.get("/api/stats/{session_id}/history", response_model=QuizHistoryPage)
+async def get_stats_history(session_id: str, limit: int = 50, cursor: Optional[str] = None,
+                            since: Optional[str] = None):
+    """Page through a session's quiz history, newest first"""
+    if not 1 <= limit <= STATS_HISTORY_MAX_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {STATS_HISTORY_MAX_PAGE}")
+    try:
+        page = await run_db(db.get_quiz_history, session_id, limit, cursor, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return QuizHistoryPage(**page)
+
+
+@app.get("/api/stats/{session_id}/rollup", response_model=ScoreRollup)
+async def get_stats_rollup(session_id: str, bucket: str = "day", since: Optional[str] = None,
+                           until: Optional[str] = None):
+    """Quiz count and scores per day or week"""
+    try:
+        buckets = await run_db(db.get_score_rollup, session_id, bucket, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return ScoreRollup(session_id=session_id, bucket=bucket, buckets=buckets)
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: warm-up has finished and Gemini models are resolved"""
+    if not warmup_done.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {
+        "status": "ready",
+        "gemini_models": len(quiz_generator.models_to_try),
+        "local_model_loaded": quiz_generator.local.loaded
+    }
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and sizes for the backend caches"""
+    return {
+        "extraction": await run_db(ocr_service.cache.stats),
+        "topics": quiz_generator.topic_cache.stats(),
+        "answer_keys": grading.keys.stats(),
+        "uploads": await run_db(upload_store.stats)
+    }
+
+
+@app.get("/api/models/health")
+async def get_model_health():
+    """Latency, error rate and circuit state for each Gemini model, plus local batching metrics"""
+    return {
+        "models": quiz_generator.router.stats(),
+        "local": await run_io(quiz_generator.local.stats)
+    }
+
+
+@app.delete("/api/cache/topics")
+async def invalidate_topic_cache(request: Optional[TextRequest] = None):
+    """Drop cached topic extractions, for one syllabus text or all of them"""
+    removed = quiz_generator.invalidate_topics(request.text if request else None)
+    return {"removed": removed}
+
+
+@app.post("/api/jobs/upload", response_model=JobResponse, status_code=202)
+async def enqueue_upload(file: UploadFile = File(...)):
+    """Upload syllabus image/PDF and process it in the background"""
+    stored = await store_upload(file)
+    
+    job_id = await run_db(job_queue.enqueue, "upload", {"file_path": stored["path"], "upload_hash": stored["sha256"]})
+    return JobResponse(job_id=job_id, status="queued")
+
+
+@app.post("/api/jobs/generate-quiz", response_model=JobResponse, status_code=202)
+async def enqueue_generate_quiz(request: QuizJobRequest):
+    """Generate a quiz in the background"""
+    session = await run_db(db.get_session, request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    job_id = await run_db(job_queue.enqueue, "generate_quiz", {
+        "session_id": request.session_id,
+        "num_questions": request.num_questions or 18,
+        "bloom_level": request.bloom_level or "Mixed",
+        "question_type": request.question_type or "mcq",
+        "adaptive": bool(request.adaptive)
+    })
+    return JobResponse(job_id=job_id, status="queued")
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Poll background job progress and result"""
+    job = await run_db(db.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatusResponse(**job)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
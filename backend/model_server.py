@@ -0,0 +1,122 @@
+"""Local model server sidecar.
+
+Loads flan-t5 (LocalGenerator, honouring LOCAL_MODEL_BACKEND and friends) and
+EasyOCR once, and serves them over a Unix socket to every API worker on the
+node. Start it before the API and point the workers at it:
+
+    python model_server.py --socket /tmp/quiz_model_server.sock
+    MODEL_SERVER_SOCKET=/tmp/quiz_model_server.sock uvicorn main:app --workers 4
+
+Requests (see services/model_client.py for the framing):
+    {"op": "ping"}                                   -> model status
+    {"op": "generate", "prompts": [...]}             -> {"texts": [...]}
+    {"op": "ocr", "image_path": ..., "options": {}}  -> {"results": [...]}
+"""
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Add current directory to path so we can import services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.local_backend import LocalGenerator
+from services.micro_batcher import MicroBatcher
+from services.model_client import DEFAULT_SOCKET_PATH, recv_message, send_message
+from services.ocr_service import load_easyocr_reader
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, load_generator: bool = True, load_ocr: bool = True):
+        # Generation requests from all workers are coalesced into shared
+        # batches and run one at a time on the scheduler thread
+        self.generator = MicroBatcher(LocalGenerator())
+        self.ocr_reader = None
+        # EasyOCR isn't thread-safe
+        self.ocr_lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = 0
+
+        if load_generator:
+            self.generator.load()
+        if load_ocr:
+            try:
+                print("Loading EasyOCR reader...")
+                self.ocr_reader = load_easyocr_reader()
+            except Exception as e:
+                print(f"Warning: Could not load EasyOCR: {e}")
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, ModelRequestHandler)
+        print(f"Model server listening on {socket_path}")
+
+    def handle_request_message(self, message):
+        self.requests += 1
+        op = message.get("op")
+        if op == "ping":
+            return {
+                "generator": self.generator.info(),
+                "scheduler": self.generator.stats(),
+                "ocr": {"loaded": self.ocr_reader is not None},
+                "uptime": round(time.time() - self.started_at, 1),
+                "requests": self.requests
+            }
+        if op == "generate":
+            if not self.generator.loaded:
+                return {"error": "Local generator is not loaded"}
+            return {"texts": self.generator.generate(message.get("prompts", []))}
+        if op == "ocr":
+            if self.ocr_reader is None:
+                return {"error": "OCR reader is not loaded"}
+            with self.ocr_lock:
+                results = self.ocr_reader.readtext(message["image_path"], **message.get("options", {}))
+            return {"results": results}
+        return {"error": f"Unknown op '{op}'"}
+
+
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, ValueError) as e:
+                print(f"Dropping malformed request: {e}")
+                return
+            if message is None:
+                return
+
+            try:
+                response = self.server.handle_request_message(message)
+            except Exception as e:
+                print(f"Model server error: {e}")
+                response = {"error": str(e)}
+            send_message(self.request, response)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=os.getenv("MODEL_SERVER_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument("--no-generator", action="store_true", help="Don't load flan-t5")
+    parser.add_argument("--no-ocr", action="store_true", help="Don't load EasyOCR")
+    args = parser.parse_args()
+
+    server = ModelServer(args.socket, load_generator=not args.no_generator, load_ocr=not args.no_ocr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,10 @@ class QuizRequest(BaseModel):
     bloom_level: Optional[str] = "Mixed"
     question_type: Optional[str] = "mcq"  # mcq, fill_ups, short_answer
 
+class QuizJobRequest(QuizRequest):
+    adaptive: Optional[bool] = False
+
+
 class ParseQuizRequest(BaseModel):
     text: str
     num_questions: Optional[int] = None
@@ -30,7 +34,7 @@ class TextRequest(BaseModel):
 class QuizQuestionResponse(BaseModel):
     question: str
     options: Optional[List[str]] = None
-    correct_answer: str | int  # int for mcq index, str for keywords
+    correct_answer: str | int | List[str]  # int for mcq index, str or list for keywords
     question_type: str = "mcq"
     source: Optional[str] = "AI"
 
@@ -47,11 +51,17 @@ class QuizSubmission(BaseModel):
     answers: Dict[str, str | int]
 
 
+class BatchSubmission(BaseModel):
+    submissions: List[QuizSubmission]
+
+
 class ResultItem(BaseModel):
     question_index: int
-    user_answer: Optional[int]
-    correct_answer: int
+    user_answer: Optional[str | int]
+    correct_answer: str | int | List[str]  # int for mcq index, str or list for keywords
     is_correct: bool
+    match: Optional[str] = None  # "fuzzy" when accepted only through typo tolerance
+    topic: Optional[str] = None
 
 
 class SubmissionResponse(BaseModel):
@@ -62,9 +72,65 @@ class SubmissionResponse(BaseModel):
     next_difficulty: str
 
 
+class BatchSubmissionItem(BaseModel):
+    quiz_id: str
+    session_id: str
+    result: Optional[SubmissionResponse] = None
+    error: Optional[str] = None
+
+
+class BatchSubmissionResponse(BaseModel):
+    graded: int
+    failed: int
+    items: List[BatchSubmissionItem]
+
+
 class PerformanceStats(BaseModel):
     session_id: str
     total_quizzes: int
     average_score: float
-    topic_performance: Dict[str, float]
+    best_score: Optional[float] = None
+    lowest_score: Optional[float] = None
+    last_score: Optional[float] = None
+    recent_average: Optional[float] = None
+    topic_performance: Dict[str, float]  # percentage of answers correct per tested topic
+    topic_attempts: Dict[str, int] = {}
+    weak_topics: List[str] = []
     quiz_history: List[Dict]
+
+
+class QuizHistoryPage(BaseModel):
+    session_id: str
+    items: List[Dict]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next (older) page
+
+
+class ScoreRollupBucket(BaseModel):
+    period_start: str
+    quizzes: int
+    average_score: float
+    min_score: float
+    max_score: float
+
+
+class ScoreRollup(BaseModel):
+    session_id: str
+    bucket: str
+    buckets: List[ScoreRollupBucket]
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    job_type: str
+    status: str  # queued, running, completed, failed
+    progress: int
+    stage: Optional[str] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
@@ -1,9 +1,15 @@
+import os
 from typing import Dict, List
 
 
 class AdaptiveQuizService:
     """Service for managing adaptive quiz difficulty"""
     
+    def __init__(self, weak_threshold: float = None, min_attempts: int = None):
+        # A topic is weak below this percentage correct, once it has been asked enough
+        self.weak_threshold = weak_threshold if weak_threshold is not None else float(os.getenv("TOPIC_WEAK_THRESHOLD", "60"))
+        self.min_attempts = min_attempts if min_attempts is not None else int(os.getenv("TOPIC_MIN_ATTEMPTS", "3"))
+    
     def determine_difficulty(self, score: float) -> str:
         """Determine next quiz difficulty based on score"""
         if score < 60:
@@ -13,6 +19,25 @@ class AdaptiveQuizService:
         else:
             return "medium"
     
+    def weak_topics(self, topic_performance: Dict[str, float], topic_attempts: Dict[str, int]) -> List[str]:
+        """Topics answered correctly less than weak_threshold percent of the time, weakest first"""
+        weak = [
+            topic for topic, accuracy in topic_performance.items()
+            if accuracy < self.weak_threshold and topic_attempts.get(topic, 0) >= self.min_attempts
+        ]
+        return sorted(weak, key=lambda topic: topic_performance[topic])
+    
+    def prioritize_topics(self, topics: List[str], topic_performance: Dict[str, float],
+                          topic_attempts: Dict[str, int]) -> List[str]:
+        """Order topics for generation: weak ones, then rarely asked ones, then the rest by accuracy"""
+        listed = set(topics)
+        weak = [t for t in self.weak_topics(topic_performance, topic_attempts) if t in listed]
+        chosen = set(weak)
+        untested = [t for t in topics if t not in chosen and topic_attempts.get(t, 0) < self.min_attempts]
+        chosen.update(untested)
+        rest = sorted((t for t in topics if t not in chosen), key=lambda t: topic_performance.get(t, 0))
+        return weak + untested + rest
+    
     def adjust_question_complexity(self, questions: List[Dict], difficulty: str) -> List[Dict]:
         """Adjust question complexity based on difficulty"""
         adjusted = []
@@ -0,0 +1,358 @@
+import math
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_NOTHING: "FrozenSet[int]" = frozenset()
+_VOWELS = frozenset("aeiouy")
+
+# Affixes that flip a term's meaning while staying within a typo's edit
+# distance (hypertonic/hypotonic, hydrophobic/hydrophilic). Suffixes are in
+# stemmed form: stem() drops the final e of -ase and -ose.
+CONFUSABLE_PREFIXES = (("hyper", "hypo"), ("inter", "intra"), ("exo", "endo", "ecto"), ("ana", "cata"),
+                       ("homo", "hetero"), ("micro", "macro"), ("sub", "super"), ("pre", "post"), ("ab", "ad"))
+CONFUSABLE_SUFFIXES = (("philic", "phobic"), ("trophic", "tropic"), ("plast", "plasm"), ("as", "os"))
+
+
+def _affix_table(groups):
+    group_of = {affix: index for index, group in enumerate(groups) for affix in group}
+    # Longest first, so 'hyper' wins over a shorter affix it starts with
+    return tuple(sorted(group_of, key=len, reverse=True)), group_of
+
+
+_PREFIXES = _affix_table(CONFUSABLE_PREFIXES)
+_SUFFIXES = _affix_table(CONFUSABLE_SUFFIXES)
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Light suffix stripping so 'enzymes'/'enzyme' and 'oxidized'/'oxidizing' agree"""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith(("sses", "xes", "zes", "ches", "shes")):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    for suffix in ("ingly", "edly", "ing", "ed", "ly"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            # 'running' -> 'runn' -> 'run'
+            if token[-1] == token[-2] and token[-1] not in "lsz":
+                token = token[:-1]
+            break
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def words(text: str) -> List[str]:
+    """Lowercase, accents and punctuation removed, unstemmed (may include empty strings)"""
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return _NON_WORD.split(text.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accents and punctuation removed, stemmed"""
+    return [stem(token) for token in words(text) if token]
+
+
+def deletions(word: str, depth: int) -> Set[str]:
+    """word plus every string reachable by deleting up to depth characters"""
+    n = len(word)
+    variants = {word}
+    if depth >= 1:
+        variants.update([word[:i] + word[i + 1:] for i in range(n)])
+    if depth >= 2:
+        variants.update([word[:i] + word[i + 1:j] + word[j + 1:] for i in range(n) for j in range(i + 1, n)])
+    if depth >= 3:
+        frontier = variants
+        for _ in range(depth - 2):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+    return variants
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """Optimal-string-alignment distance (edits plus adjacent swaps) <= limit.
+
+    Skips the common prefix and branches on the first mismatch, so with the
+    small limits used for grading it is a few slice comparisons, not a DP table.
+    """
+    if a == b:
+        return True
+    if limit <= 0 or abs(len(a) - len(b)) > limit:
+        return False
+    i = 0
+    shortest = min(len(a), len(b))
+    while i < shortest and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    if not a or not b:
+        return max(len(a), len(b)) <= limit
+    limit -= 1
+    return (within_distance(a[1:], b[1:], limit)
+            or within_distance(a[1:], b, limit)
+            or within_distance(a, b[1:], limit)
+            or (len(a) > 1 and len(b) > 1 and a[0] == b[1] and a[1] == b[0]
+                and within_distance(a[2:], b[2:], limit)))
+
+
+def first_syllable(word: str) -> str:
+    """Leading consonants and the first vowel ('pro' for 'proton', 'e' for 'exo')"""
+    i = 0
+    while i < len(word) and word[i] not in _VOWELS:
+        i += 1
+    return word[:i + 1]
+
+
+def _affix(word: str, affixes, suffix: bool) -> Optional[str]:
+    # One tuple startswith/endswith call rules out almost every word
+    if suffix:
+        return next((affix for affix in affixes if word.endswith(affix)), None) if word.endswith(affixes) else None
+    return next((affix for affix in affixes if word.startswith(affix)), None) if word.startswith(affixes) else None
+
+
+def _affixes_differ(a: str, b: str, affixes, group_of, suffix: bool) -> bool:
+    affix_a = _affix(a, affixes, suffix)
+    affix_b = affix_a and _affix(b, affixes, suffix)
+    if not affix_b:
+        return False
+    return affix_a != affix_b and group_of[affix_a] == group_of[affix_b]
+
+
+def same_root(a: str, b: str) -> bool:
+    """Whether b can be a misspelling of a rather than a different term.
+
+    Typos are only tolerated after the first syllable, and never when the
+    two words carry different affixes from one confusable group.
+    """
+    return (first_syllable(a) == first_syllable(b)
+            and not _affixes_differ(a, b, *_PREFIXES, suffix=False)
+            and not _affixes_differ(a, b, *_SUFFIXES, suffix=True))
+
+
+class AnswerMatcher:
+    """Typo-tolerant matching rules shared by every compiled answer key.
+
+    Tokens shorter than ``min_length`` and tokens with digits must match
+    exactly; shorter words allow one edit, words of ``long_length`` or more
+    allow ``max_edits``, as long as the edits leave the word's root alone
+    (same_root). A short answer needs ``keyword_ratio`` of its keywords.
+    ``fuzzy=False`` keeps only the exact comparisons.
+    """
+
+    def __init__(self, fuzzy: Optional[bool] = None, min_length: Optional[int] = None,
+                 long_length: Optional[int] = None, max_edits: Optional[int] = None,
+                 keyword_ratio: Optional[float] = None):
+        if fuzzy is None:
+            fuzzy = os.getenv("GRADING_FUZZY", "1") != "0"
+        self.fuzzy = fuzzy
+        self.min_length = min_length or int(os.getenv("GRADING_FUZZY_MIN_LENGTH", "4"))
+        self.long_length = long_length or int(os.getenv("GRADING_FUZZY_LONG_LENGTH", "8"))
+        self.max_edits = max_edits if max_edits is not None else int(os.getenv("GRADING_FUZZY_MAX_EDITS", "2"))
+        if keyword_ratio is None:
+            keyword_ratio = float(os.getenv("GRADING_KEYWORD_RATIO", "0.5"))
+        self.keyword_ratio = keyword_ratio
+
+    def allowed_edits(self, token: str) -> int:
+        if not self.fuzzy or len(token) < self.min_length or not token.isalpha():
+            return 0
+        if len(token) < self.long_length:
+            return min(1, self.max_edits)
+        return self.max_edits
+
+    def keywords_needed(self, count: int) -> int:
+        # 0.5 reproduces the original (len + 1) // 2
+        return max(1, math.ceil(count * self.keyword_ratio))
+
+    def compile_exact(self, answer: str) -> "ExactAnswer":
+        return ExactAnswer(answer, self)
+
+    def compile_keywords(self, keywords: Iterable[str]) -> "KeywordAnswer":
+        return KeywordAnswer(list(keywords), self)
+
+
+class TokenIndex:
+    """Deletion-neighbourhood index over an answer key's tokens (SymSpell style).
+
+    Built once per answer key from every deletion variant of each token's
+    first ``prefix_length`` characters. A student's token whose first
+    syllable no key token shares is rejected at once (same_root would refuse
+    it anyway); when at most ``scan_limit`` key tokens share it they are
+    compared directly. Otherwise the lookup costs one probe per variant of
+    the token's own prefix, whatever the number of key tokens, and only
+    tokens sharing a variant are confirmed with within_distance. A token one
+    edit from some key token is not also tried against two-edit matches. Lookups are memoized, since a class tends to
+    write the same words.
+    """
+
+    def __init__(self, tokens: Iterable[str], matcher: AnswerMatcher, prefix_length: int = 7,
+                 memo_size: int = 4096, scan_limit: int = 4):
+        self.prefix_length = prefix_length
+        self.tokens: List[str] = []
+        self.limits: List[int] = []
+        self.exact: Dict[str, FrozenSet[int]] = {}
+        self.variants: Dict[str, List[int]] = {}
+        for token in tokens:
+            if token in self.exact:
+                continue
+            token_id = len(self.tokens)
+            self.tokens.append(token)
+            self.exact[token] = frozenset((token_id,))
+            limit = matcher.allowed_edits(token)
+            self.limits.append(limit)
+            if limit:
+                for variant in deletions(token[:prefix_length], limit):
+                    self.variants.setdefault(variant, []).append(token_id)
+        self.depth = max(self.limits, default=0)
+        fuzzy_lengths = [len(token) for token, limit in zip(self.tokens, self.limits) if limit]
+        # Student tokens outside this length range can't be within any budget
+        self.min_length = min(fuzzy_lengths, default=0) - self.depth
+        self.max_length = max(fuzzy_lengths, default=0) + self.depth
+        # same_root rejects any other first syllable, so most wrong words are
+        # turned away by one dict probe; when only a few key tokens share the
+        # syllable, comparing against them directly beats building variants
+        self.syllables: Dict[str, List[int]] = {}
+        for token_id, (token, limit) in enumerate(zip(self.tokens, self.limits)):
+            if limit:
+                self.syllables.setdefault(first_syllable(token), []).append(token_id)
+        self.scan_limit = scan_limit
+        # Shorter student tokens can't be within max_edits of a long key token
+        self.deep_from = matcher.long_length - matcher.max_edits
+        # Key tokens plus memoized lookups, so a repeated word is one dict probe
+        self.memo_size = memo_size
+        self._seen: Dict[str, FrozenSet[int]] = dict(self.exact)
+
+    def lookup(self, token: str) -> FrozenSet[int]:
+        """Ids of the key tokens this token matches within their edit budgets"""
+        matched = self._seen.get(token)
+        if matched is None:
+            matched = self._search(token)
+            if len(self._seen) >= len(self.exact) + self.memo_size:
+                self._seen = dict(self.exact)
+            self._seen[token] = matched
+        return matched
+
+    def _search(self, token: str) -> FrozenSet[int]:
+        if not self.min_length <= len(token) <= self.max_length or not token.isalpha():
+            return _NOTHING
+        same_syllable = self.syllables.get(first_syllable(token))
+        if not same_syllable:
+            return _NOTHING
+        if len(same_syllable) <= self.scan_limit:
+            found = self._check(token, same_syllable)
+            return frozenset(found) if found else _NOTHING
+        # Most typos are one edit: only try two-deletion variants (long key
+        # tokens) when nothing is found with one
+        prefix = token[:self.prefix_length]
+        shallow = deletions(prefix, 1)
+        found = self._confirm(token, shallow)
+        if not found and self.depth > 1 and len(token) >= self.deep_from:
+            found = self._confirm(token, deletions(prefix, self.depth) - shallow)
+        return frozenset(found) if found else _NOTHING
+
+    def _confirm(self, token: str, variants: Set[str]) -> Set[int]:
+        tried = set()
+        # Probing each variant beats keys() & variants, which copies the keys
+        for variant in variants:
+            tried.update(self.variants.get(variant, ()))
+        return self._check(token, tried)
+
+    def _check(self, token: str, candidates: Iterable[int]) -> Set[int]:
+        found = set()
+        for candidate in candidates:
+            key_token = self.tokens[candidate]
+            if within_distance(token, key_token, self.limits[candidate]) and same_root(key_token, token):
+                found.add(candidate)
+        return found
+
+
+class ExactAnswer:
+    """fill_ups: the whole answer must match, each word within its edit budget"""
+
+    __slots__ = ("legacy", "fuzzy", "normalized", "tokens", "limits")
+
+    def __init__(self, answer: str, matcher: AnswerMatcher):
+        self.legacy = answer.strip().lower()
+        self.fuzzy = matcher.fuzzy
+        self.tokens = tokenize(answer)
+        self.normalized = " ".join(self.tokens)
+        self.limits = [matcher.allowed_edits(token) for token in self.tokens]
+
+    def match(self, user_answer: str) -> Optional[str]:
+        """'exact' under the original rule, 'fuzzy' if only normalization or typo tolerance accepts it, else None"""
+        if user_answer.strip().lower() == self.legacy:
+            return "exact"
+        if not self.fuzzy:
+            return None
+        tokens = tokenize(user_answer)
+        if not tokens or len(tokens) != len(self.tokens):
+            return None
+        if " ".join(tokens) == self.normalized:
+            return "fuzzy"
+        for token, expected, limit in zip(tokens, self.tokens, self.limits):
+            if token != expected and not (limit and within_distance(token, expected, limit)
+                                          and same_root(expected, token)):
+                return None
+        return "fuzzy"
+
+
+class KeywordAnswer:
+    """short_answer: enough comma-separated keywords must appear in the answer.
+
+    A keyword counts if it is a substring of the answer (the original rule)
+    or if every one of its words matches some word of the answer.
+    """
+
+    __slots__ = ("keywords", "fuzzy", "needed", "keyword_tokens", "index")
+
+    def __init__(self, keywords: List[str], matcher: AnswerMatcher):
+        self.fuzzy = matcher.fuzzy
+        self.keywords = tuple(k.strip().lower() for k in keywords)
+        self.needed = matcher.keywords_needed(len(self.keywords))
+        self.index = TokenIndex((token for keyword in self.keywords for token in tokenize(keyword)), matcher)
+        self.keyword_tokens = tuple(
+            frozenset(token_id for token in tokenize(keyword) for token_id in self.index.exact[token]) for keyword in self.keywords
+        )
+
+    def match(self, user_answer: str) -> Optional[str]:
+        """'exact' under the original substring rule, 'fuzzy' if only word matching accepts it, else None"""
+        user_val = user_answer.lower()
+        missing = []
+        matches = 0
+        for position, keyword in enumerate(self.keywords):
+            if keyword in user_val:
+                matches += 1
+            else:
+                missing.append(position)
+        if matches >= self.needed:
+            return "exact"
+        if not self.fuzzy:
+            return None
+
+        pending = [self.keyword_tokens[position] for position in missing if self.keyword_tokens[position]]
+        # Even matching every remaining keyword wouldn't be enough
+        if matches + len(pending) < self.needed:
+            return None
+        found: Set[int] = set()
+        # Stemmed lazily, since most accepted answers stop part way through
+        for word in words(user_answer):
+            if not word:
+                continue
+            ids = self.index.lookup(stem(word))
+            if not ids or ids <= found:
+                continue
+            found |= ids
+            # Stop reading the answer as soon as enough keywords are covered
+            for tokens in [tokens for tokens in pending if tokens <= found]:
+                pending.remove(tokens)
+                matches += 1
+                if matches >= self.needed:
+                    return "fuzzy"
+        return None
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file in chunks so large uploads are never fully loaded into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed, size-bounded LRU cache of extracted text.
+
+    Entries are keyed by the SHA-256 of the file bytes plus the extraction
+    backend, so re-uploading the same syllabus skips OCR entirely no matter
+    what the file is called.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.db_path = db_path or os.getenv("OCR_CACHE_PATH", "extraction_cache.db")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    file_hash TEXT,
+                    backend TEXT,
+                    text TEXT,
+                    size INTEGER,
+                    last_accessed REAL,
+                    PRIMARY KEY (file_hash, backend)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed ON extraction_cache(last_accessed)"
+            )
+            self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, file_hash: str, backend: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM extraction_cache WHERE file_hash = ? AND backend = ?",
+                (file_hash, backend)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE extraction_cache SET last_accessed = ? WHERE file_hash = ? AND backend = ?",
+                (time.time(), file_hash, backend)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, file_hash: str, backend: str, text: str):
+        if not self.enabled:
+            return
+
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO extraction_cache (file_hash, backend, text, size, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+            """, (file_hash, backend, text, size, time.time()))
+            self._evict()
+            self._conn.commit()
+
+    def get_many(self, file_hash: str, backends: List[str]) -> Dict[str, str]:
+        """Cached text for each of several backends of one file (e.g. per-page entries)"""
+        if not self.enabled or not backends:
+            return {}
+
+        found = {}
+        with self._lock:
+            # Stay well under sqlite's bound-parameter limit
+            for start in range(0, len(backends), 500):
+                chunk = backends[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT backend, text FROM extraction_cache WHERE file_hash = ? AND backend IN ({placeholders})",
+                    [file_hash] + chunk
+                ).fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE extraction_cache SET last_accessed = ? WHERE file_hash = ? AND backend = ?",
+                    [(now, file_hash, backend) for backend in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(backends) - len(found)
+        return found
+
+    def put_many(self, file_hash: str, entries: Dict[str, str]):
+        """Store several backends' text for one file in a single transaction"""
+        if not self.enabled or not entries:
+            return
+
+        now = time.time()
+        rows = []
+        for backend, text in entries.items():
+            size = len(text.encode("utf-8"))
+            if size <= self.max_bytes:
+                rows.append((file_hash, backend, text, size, now))
+
+        with self._lock:
+            self._conn.executemany("""
+                INSERT OR REPLACE INTO extraction_cache (file_hash, backend, text, size, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT file_hash, backend, size FROM extraction_cache ORDER BY last_accessed"
+        ).fetchall()
+        for file_hash, backend, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM extraction_cache WHERE file_hash = ? AND backend = ?",
+                (file_hash, backend)
+            )
+            total -= size
+
+    def get_or_extract(self, file_hash: str, backend: str, extract) -> str:
+        """Return cached text for this file/backend, or run extract() and cache a non-empty result"""
+        text = self.get(file_hash, backend)
+        if text is not None:
+            print(f"Extraction cache hit ({backend}, {file_hash[:12]})")
+            return text
+
+        text = extract()
+        if text and text.strip():
+            self.put(file_hash, backend, text)
+        return text
+
+    def stats(self) -> Dict:
+        if not self.enabled:
+            return {"enabled": False, "hits": self.hits, "misses": self.misses}
+
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,177 @@
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.answer_matching import AnswerMatcher
+from services.cache import TTLCache
+
+
+def next_difficulty(score_percentage: float) -> str:
+    return "easy" if score_percentage < 60 else "hard" if score_percentage >= 80 else "medium"
+
+
+class CompiledQuestion:
+    """One question's correct answer, normalized once for repeated grading"""
+
+    __slots__ = ("index", "key", "question_type", "correct_answer", "topic", "expected", "matchers")
+
+    def __init__(self, index: int, question: Dict, matcher: AnswerMatcher):
+        self.index = index
+        self.key = str(index)
+        self.question_type = question.get("question_type", "mcq")
+        self.correct_answer = question["correct_answer"]
+        self.topic = question.get("topic")
+        self.expected = None
+        # ExactAnswer / KeywordAnswer with their token index built once
+        self.matchers = []
+
+        if self.question_type == "mcq":
+            self.expected = str(self.correct_answer)
+            return
+        # Gemini is asked for short_answer keywords as a list; older quizzes
+        # store them comma-separated
+        if isinstance(self.correct_answer, list):
+            answers = [str(answer) for answer in self.correct_answer]
+        elif isinstance(self.correct_answer, str):
+            answers = self.correct_answer.split(",") if self.question_type == "short_answer" else [self.correct_answer]
+        else:
+            answers = []
+        if not answers:
+            return
+        if self.question_type == "fill_ups":
+            # A list of fill_ups answers are alternatives
+            self.matchers = [matcher.compile_exact(answer) for answer in answers]
+        elif self.question_type == "short_answer":
+            self.matchers = [matcher.compile_keywords(answers)]
+
+    def grade(self, user_answer: Any) -> Optional[str]:
+        """How the answer matched ('exact' or 'fuzzy'), or None if it is wrong"""
+        if self.question_type == "mcq":
+            return "exact" if str(user_answer) == self.expected else None
+        if not isinstance(user_answer, str):
+            return None
+        best = None
+        for compiled in self.matchers:
+            match = compiled.match(user_answer)
+            if match == "exact":
+                return match
+            best = best or match
+        return best
+
+
+class AnswerKey:
+    """A quiz compiled for grading: no JSON decoding or keyword splitting per submission"""
+
+    def __init__(self, quiz_id: str, quiz: Dict, matcher: AnswerMatcher):
+        self.quiz_id = quiz_id
+        self.questions = [CompiledQuestion(i, question, matcher) for i, question in enumerate(quiz["questions"])]
+        self.total = len(self.questions)
+
+    def grade(self, answers: Dict[str, Any]) -> Dict:
+        correct = 0
+        results = []
+        for question in self.questions:
+            user_answer = answers.get(question.key)
+            match = question.grade(user_answer)
+            if match:
+                correct += 1
+            result = {
+                "question_index": question.index,
+                "user_answer": user_answer,
+                "correct_answer": question.correct_answer,
+                "is_correct": match is not None
+            }
+            if match == "fuzzy":
+                # Lets a teacher find answers accepted only through typo tolerance
+                result["match"] = match
+            if question.topic:
+                # Feeds the per-topic counters kept by save_submission
+                result["topic"] = question.topic
+            results.append(result)
+
+        score_percentage = (correct / self.total) * 100 if self.total else 0.0
+        return {
+            "score": score_percentage,
+            "correct": correct,
+            "total": self.total,
+            "results": results,
+            "next_difficulty": next_difficulty(score_percentage)
+        }
+
+
+class GradingService:
+    """Grades submissions against answer keys compiled once per quiz and kept in memory.
+
+    Stored quizzes never change, so compiled keys need no expiry; the LRU
+    bound only limits memory. ``submit_many`` loads every missing key with one
+    query and writes all submissions in one transaction, for exam-day bursts.
+    """
+
+    def __init__(self, db, cache_size: Optional[int] = None, matcher: Optional[AnswerMatcher] = None):
+        self.db = db
+        self.matcher = matcher or AnswerMatcher()
+        self.keys = TTLCache(max_entries=cache_size or int(os.getenv("ANSWER_KEY_CACHE_SIZE", "1024")))
+
+    def answer_key(self, quiz_id: str) -> Optional[AnswerKey]:
+        return self.answer_keys([quiz_id]).get(quiz_id)
+
+    def answer_keys(self, quiz_ids: Iterable[str]) -> Dict[str, AnswerKey]:
+        keys = {}
+        missing = []
+        for quiz_id in dict.fromkeys(quiz_ids):
+            key = self.keys.get(quiz_id)
+            if key is None:
+                missing.append(quiz_id)
+            else:
+                keys[quiz_id] = key
+
+        if missing:
+            for quiz_id, quiz in self.db.get_quizzes(missing).items():
+                key = AnswerKey(quiz_id, quiz, self.matcher)
+                self.keys.set(quiz_id, key)
+                keys[quiz_id] = key
+        return keys
+
+    def submit(self, quiz_id: str, session_id: str, answers: Dict[str, Any],
+               build: Optional[Callable[[Dict], Any]] = None) -> Any:
+        """Grade and store one submission; None if the quiz doesn't exist.
+
+        ``build`` turns the graded result into the response (e.g. a pydantic
+        model) before anything is saved, so a result that can't be returned
+        is never stored; its return value is returned instead of the dict.
+        """
+        key = self.answer_key(quiz_id)
+        if key is None:
+            return None
+        graded = key.grade(answers)
+        response = build(graded) if build else graded
+        self.db.save_submission(quiz_id, session_id, graded["score"], graded["results"])
+        return response
+
+    def submit_many(self, submissions: List[Dict], build: Optional[Callable[[Dict], Any]] = None) -> List[Any]:
+        """Grade and store many submissions ({quiz_id, session_id, answers}).
+
+        Returns one entry per submission, in order: the graded result (or
+        ``build(graded)``, see submit), or an ``{"error": ...}`` dict for a
+        quiz that doesn't exist or a result ``build`` rejects. Only
+        successful entries are saved.
+        """
+        keys = self.answer_keys(s["quiz_id"] for s in submissions)
+
+        outcomes = []
+        rows = []
+        for submission in submissions:
+            key = keys.get(submission["quiz_id"])
+            if key is None:
+                outcomes.append({"error": "Quiz not found"})
+                continue
+            graded = key.grade(submission["answers"])
+            try:
+                outcomes.append(build(graded) if build else graded)
+            except Exception as e:
+                outcomes.append({"error": f"Could not grade submission: {e}"})
+                continue
+            rows.append((submission["quiz_id"], submission["session_id"], graded["score"], graded["results"]))
+
+        if rows:
+            self.db.save_submissions(rows)
+        return outcomes
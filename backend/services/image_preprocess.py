@@ -0,0 +1,113 @@
+import os
+from typing import List, Optional
+
+# PIL is imported on first use, like the OCR backends it feeds.
+
+
+def otsu_threshold(gray) -> int:
+    """Global threshold that best separates ink from background, from the histogram"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    best_level, best_variance = 127, -1.0
+    background = weighted_background = 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+class ImagePreprocessor:
+    """Prepares images for EasyOCR.
+
+    - Resolution is normalized to ``target_dpi``, taking the image width as a
+      page ``page_width_inches`` wide. Phone photos are scaled down instead of
+      being magnified further; only images under half the target resolution
+      (small crops) are scaled up, at most ``max_upscale`` times.
+    - Grayscale, then Otsu binarization (``OCR_BINARIZE=0`` keeps grayscale).
+    - Images taller than ``tile_height`` after scaling (long screenshots) are
+      cut into tiles at the blankest row near each boundary, so no line of
+      text is split, and the detector never works on one huge canvas.
+    """
+
+    def __init__(self, target_dpi: Optional[int] = None, page_width_inches: float = 8.5,
+                 max_upscale: float = 2.0, binarize: Optional[bool] = None, tile_height: Optional[int] = None):
+        self.target_dpi = target_dpi or int(os.getenv("OCR_TARGET_DPI", "200"))
+        self.page_width_inches = page_width_inches
+        self.max_upscale = max_upscale
+        if binarize is None:
+            binarize = os.getenv("OCR_BINARIZE", "1") != "0"
+        self.binarize = binarize
+        self.tile_height = tile_height or int(os.getenv("OCR_TILE_HEIGHT", "2000"))
+
+    def scale_for(self, width: int) -> float:
+        effective_dpi = width / self.page_width_inches
+        if effective_dpi > self.target_dpi:
+            return self.target_dpi / effective_dpi
+        # Upscaling costs detector time for little gain unless the text is tiny
+        if effective_dpi >= self.target_dpi / 2:
+            return 1.0
+        return min(self.max_upscale, self.target_dpi / effective_dpi)
+
+    def prepare(self, image):
+        """Normalized, grayscale (and binarized) copy of a PIL image"""
+        from PIL import Image, ImageOps
+        image = ImageOps.exif_transpose(image)
+        gray = image.convert("L")
+
+        scale = self.scale_for(gray.width)
+        if abs(scale - 1.0) > 0.05:
+            size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+            gray = gray.resize(size, Image.LANCZOS if scale < 1 else Image.BICUBIC)
+
+        if self.binarize:
+            threshold = otsu_threshold(gray)
+            gray = gray.point(lambda level: 255 if level > threshold else 0)
+        return gray
+
+    def tiles(self, image) -> List:
+        """Split a tall prepared image into horizontal strips"""
+        # A little over one tile is cheaper to read whole than as a sliver
+        if image.height <= self.tile_height * 1.25:
+            return [image]
+
+        strips = []
+        top = 0
+        while image.height - top > self.tile_height * 1.25:
+            cut = self._blank_row(image, top + self.tile_height * 3 // 4, top + self.tile_height)
+            strips.append(image.crop((0, top, image.width, cut)))
+            top = cut
+        strips.append(image.crop((0, top, image.width, image.height)))
+        return strips
+
+    def prepare_file(self, image_path: str, out_dir: str) -> List[str]:
+        """Preprocess image_path into one or more PNG tiles under out_dir, in reading order"""
+        from PIL import Image
+        with Image.open(image_path) as image:
+            prepared = self.prepare(image)
+
+        paths = []
+        for index, tile in enumerate(self.tiles(prepared)):
+            path = os.path.join(out_dir, f"tile-{index:03d}.png")
+            tile.save(path, format="PNG")
+            paths.append(path)
+        return paths
+
+    def _blank_row(self, image, start: int, stop: int) -> int:
+        """Row in [start, stop) with the least ink, preferring the lowest"""
+        from PIL import Image
+        # Averaging each row down to one pixel gives its mean brightness
+        means = image.crop((0, start, image.width, stop)).resize((1, stop - start), Image.BOX).tobytes()
+        best = max(range(len(means)), key=lambda offset: (means[offset], offset))
+        return start + best
@@ -0,0 +1,117 @@
+import os
+import socket
+import threading
+import traceback
+import uuid
+from typing import Callable, Dict, List, Optional
+
+
+# A handler receives the job payload and a progress callback(percent, stage)
+# and returns a JSON-serialisable result dict.
+JobHandler = Callable[[Dict, Callable[[int, str], None]], Dict]
+
+
+class JobQueue:
+    """Worker threads that drain the sqlite-backed jobs table.
+
+    Several processes (uvicorn --workers) can share the table. Each claims
+    jobs under its own worker id and heartbeats them every lease/4 seconds;
+    a running job is requeued only once its heartbeat is ``lease_seconds``
+    old, i.e. its process died, never while a sibling is still running it.
+    """
+
+    def __init__(self, db, num_workers: Optional[int] = None, poll_interval: float = 1.0,
+                 lease_seconds: Optional[float] = None):
+        self.db = db
+        self.num_workers = num_workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def register(self, job_type: str, handler: JobHandler):
+        self.handlers[job_type] = handler
+
+    def enqueue(self, job_type: str, payload: Dict) -> str:
+        """Persist a job and wake a worker, returns the job id"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = self.db.create_job(job_type, payload)
+        self._wakeup.set()
+        return job_id
+
+    def start(self):
+        """Requeue jobs whose lease expired and start the workers and heartbeat"""
+        if self._threads:
+            return
+        self._requeue_expired()
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        print(f"Job queue started with {self.num_workers} worker(s) as {self.worker_id}")
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _requeue_expired(self):
+        requeued = self.db.requeue_expired_jobs(self.lease_seconds)
+        if requeued:
+            print(f"Requeued {requeued} job(s) whose worker stopped responding")
+            self._wakeup.set()
+
+    def _heartbeat_loop(self):
+        # Also picks up jobs abandoned by a crashed sibling without waiting for a restart
+        while not self._stopping.wait(self.lease_seconds / 4):
+            try:
+                self.db.heartbeat_jobs(self.worker_id)
+                self._requeue_expired()
+            except Exception as e:
+                print(f"Job queue heartbeat error: {e}")
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.db.claim_next_job(self.worker_id)
+            except Exception as e:
+                print(f"Job queue error while claiming job: {e}")
+                job = None
+
+            if job is None:
+                # Nothing to do: sleep until an enqueue wakes us or the poll interval passes
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run_job(job)
+
+    def _run_job(self, job: Dict):
+        job_id = job["job_id"]
+        handler = self.handlers.get(job["job_type"])
+        if handler is None:
+            self.db.finish_job(job_id, error=f"No handler for job type {job['job_type']}", worker_id=self.worker_id)
+            return
+
+        def report_progress(progress: int, stage: str):
+            self.db.update_job_progress(job_id, progress, stage)
+
+        try:
+            result = handler(job["payload"], report_progress)
+            finished = self.db.finish_job(job_id, result=result, worker_id=self.worker_id)
+        except Exception as e:
+            print(f"Job {job_id} ({job['job_type']}) failed: {e}")
+            traceback.print_exc()
+            finished = self.db.finish_job(job_id, error=str(e), worker_id=self.worker_id)
+        if not finished:
+            print(f"Job {job_id} lost its lease before finishing; its requeued run will report the result")
@@ -0,0 +1,144 @@
+"""Inference backends for the local flan-t5 question generator.
+
+Every backend returns a ``(tokenizer, model, device)`` triple where ``model``
+exposes the Hugging Face ``generate(**inputs, ...)`` API, so ``LocalGenerator``
+doesn't care which one is loaded:
+
+- ``torch``: full-precision ``T5ForConditionalGeneration`` (GPU if available)
+- ``torch-int8``: the same weights with ``nn.Linear`` layers dynamically
+  quantized to int8 (CPU only)
+- ``onnx``: an ONNX Runtime export produced by ``convert_model.py``, run
+  through ``optimum.onnxruntime`` (CPU only)
+"""
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_MODEL = "google/flan-t5-base"
+DEFAULT_ONNX_PATH = "./flan_t5_onnx"
+
+
+def default_model_path(backend: str) -> str:
+    return DEFAULT_ONNX_PATH if backend == "onnx" else DEFAULT_MODEL
+
+
+def load_local_backend(backend: str, model_path: str, num_threads: int = 0) -> Tuple[Any, Any, str]:
+    """Load tokenizer and model for a backend; num_threads > 0 caps intra-op threads"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown local model backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        return _load_onnx(model_path, num_threads)
+    return _load_torch(model_path, num_threads, quantize=backend == "torch-int8")
+
+
+def _load_torch(model_path: str, num_threads: int, quantize: bool) -> Tuple[Any, Any, str]:
+    import torch
+    from transformers import T5ForConditionalGeneration, T5Tokenizer
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    tokenizer = T5Tokenizer.from_pretrained(model_path)
+    model = T5ForConditionalGeneration.from_pretrained(model_path)
+    model.eval()
+
+    if quantize:
+        # Dynamic quantization only targets CPU kernels
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model, "cpu"
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return tokenizer, model.to(device), device
+
+
+def _load_onnx(model_path: str, num_threads: int) -> Tuple[Any, Any, str]:
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'")
+    from transformers import AutoTokenizer
+
+    session_options = onnxruntime.SessionOptions()
+    if num_threads > 0:
+        session_options.intra_op_num_threads = num_threads
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_path, session_options=session_options)
+    return tokenizer, model, "cpu"
+
+
+class LocalGenerator:
+    """flan-t5 loaded in this process, generating in padded batches"""
+
+    def __init__(self, backend: Optional[str] = None, model_path: Optional[str] = None,
+                 batch_size: Optional[int] = None, num_threads: Optional[int] = None):
+        # torch, torch-int8 (dynamic quantization) or onnx (see convert_model.py)
+        self.backend = backend or os.getenv("LOCAL_MODEL_BACKEND", "torch")
+        self.model_path = model_path or os.getenv("LOCAL_MODEL_PATH") or default_model_path(self.backend)
+        # Segments per generate() call, and intra-op threads for CPU inference
+        # (0 keeps the runtime default of one per core)
+        self.batch_size = max(1, batch_size or int(os.getenv("LOCAL_BATCH_SIZE", "8")))
+        self.num_threads = num_threads if num_threads is not None else int(os.getenv("LOCAL_NUM_THREADS", "0"))
+        self.tokenizer = None
+        self.model = None
+        self.device = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self) -> bool:
+        """Load the model once; returns False if no backend could be loaded"""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        if self.model is None:
+            try:
+                print(f"Loading local AI model ({self.model_path}, {self.backend} backend)...")
+                self.tokenizer, self.model, self.device = load_local_backend(
+                    self.backend, self.model_path, self.num_threads
+                )
+                print(f"Local AI model loaded on {self.device} (batch size {self.batch_size})")
+            except Exception as e:
+                print(f"Error loading local model: {e}")
+                if self.backend == "torch":
+                    return False
+                # A missing export or optimum install shouldn't take the fallback away
+                print("Retrying with the full-precision torch backend...")
+                self.backend = "torch"
+                self.model_path = default_model_path("torch")
+                return self._load()
+        return True
+
+    def generate(self, prompts: List[str]) -> List[Optional[str]]:
+        """Run the model over prompts in padded batches; None marks a failed batch"""
+        import torch
+
+        results: List[Optional[str]] = []
+        for start in range(0, len(prompts), self.batch_size):
+            batch = prompts[start:start + self.batch_size]
+            try:
+                inputs = self.tokenizer(
+                    batch, return_tensors="pt", max_length=256, truncation=True, padding=True
+                ).to(self.device)
+                with torch.no_grad():
+                    outputs = self.model.generate(**inputs, max_length=64, do_sample=True, temperature=0.8)
+                results.extend(self.tokenizer.batch_decode(outputs, skip_special_tokens=True))
+            except Exception as e:
+                print(f"Local model error: {e}")
+                results.extend([None] * len(batch))
+        return results
+
+    def info(self) -> dict:
+        return {
+            "backend": self.backend,
+            "model_path": self.model_path,
+            "device": self.device,
+            "batch_size": self.batch_size,
+            "loaded": self.loaded
+        }
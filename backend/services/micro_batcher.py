@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+
+class _PendingRequest:
+    __slots__ = ("prompts", "enqueued_at", "done", "results")
+
+    def __init__(self, prompts: List[str]):
+        self.prompts = prompts
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.results: List[Optional[str]] = []
+
+
+class MicroBatcher:
+    """Coalesces concurrent generate() calls into shared batches.
+
+    Wraps a LocalGenerator (same load/generate/info interface). The first
+    queued request waits at most ``max_wait_ms`` for others to arrive, or
+    less once a full batch (the generator's batch size) is waiting; then all
+    collected prompts run through one generate() call on a single scheduler
+    thread and the results are handed back to each caller.
+    """
+
+    def __init__(self, generator, max_wait_ms: Optional[float] = None, history: int = 1000):
+        self.generator = generator
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("LOCAL_BATCH_WAIT_MS", "10"))
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.prompts = 0
+        self._waits = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+
+    @property
+    def loaded(self) -> bool:
+        return self.generator.loaded
+
+    @property
+    def batch_size(self) -> int:
+        return self.generator.batch_size
+
+    @batch_size.setter
+    def batch_size(self, value: int):
+        self.generator.batch_size = value
+
+    def load(self) -> bool:
+        return self.generator.load()
+
+    def info(self) -> dict:
+        return self.generator.info()
+
+    def generate(self, prompts: List[str]) -> List[Optional[str]]:
+        if not prompts:
+            return []
+        request = _PendingRequest(prompts)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+            self._queue.append(request)
+            self._cond.notify()
+        request.done.wait()
+        return request.results
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            prompts = [p for request in batch for p in request.prompts]
+            try:
+                results = self.generator.generate(prompts)
+            except Exception as e:
+                print(f"Micro-batch failed: {e}")
+                results = [None] * len(prompts)
+
+            with self._cond:
+                self.batches += 1
+                self.requests += len(batch)
+                self.prompts += len(prompts)
+                self._batch_sizes.append(len(prompts))
+                self._waits.extend(started - request.enqueued_at for request in batch)
+
+            offset = 0
+            for request in batch:
+                request.results = results[offset:offset + len(request.prompts)]
+                offset += len(request.prompts)
+                request.done.set()
+
+    def _collect(self) -> List[_PendingRequest]:
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while True:
+                queued = sum(len(request.prompts) for request in self._queue)
+                remaining = deadline - time.monotonic()
+                if queued >= self.generator.batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Always take the oldest request; add more while they fit in a batch
+            batch = [self._queue.popleft()]
+            size = len(batch[0].prompts)
+            while self._queue and size + len(self._queue[0].prompts) <= self.generator.batch_size:
+                request = self._queue.popleft()
+                batch.append(request)
+                size += len(request.prompts)
+            return batch
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits)
+            sizes = list(self._batch_sizes)
+            queue_depth = len(self._queue)
+            requests, batches, prompts = self.requests, self.batches, self.prompts
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "requests": requests,
+            "batches": batches,
+            "prompts": prompts,
+            "queue_depth": queue_depth,
+            "max_wait_ms": self.max_wait * 1000,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "avg_requests_per_batch": round(requests / batches, 2) if batches else 0.0,
+            "queue_wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0
+            }
+        }
@@ -0,0 +1,119 @@
+"""Thin clients for the local model server sidecar (model_server.py).
+
+The sidecar holds flan-t5 and EasyOCR once per node; API workers talk to it
+over a Unix socket instead of loading their own copies. Messages are JSON
+objects framed by a 4-byte big-endian length.
+"""
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SOCKET_PATH = "/tmp/quiz_model_server.sock"
+_HEADER = struct.Struct("!I")
+
+
+class ModelServerError(RuntimeError):
+    """The model server was unreachable or reported an error"""
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]):
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Read one framed message; None when the peer closed the connection"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    body = _recv_exact(sock, length)
+    if body is None:
+        raise ConnectionError("Connection closed mid-message")
+    return json.loads(body.decode("utf-8"))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class ModelServerClient:
+    """One request per connection; Unix socket connects are cheap enough"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, op: str, **payload) -> Dict[str, Any]:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                send_message(sock, {"op": op, **payload})
+                response = recv_message(sock)
+        except (OSError, ValueError) as e:
+            raise ModelServerError(f"Model server at {self.socket_path} unavailable: {e}")
+
+        if response is None:
+            raise ModelServerError("Model server closed the connection")
+        if "error" in response:
+            raise ModelServerError(response["error"])
+        return response
+
+
+class RemoteLocalGenerator:
+    """Drop-in for LocalGenerator that runs generation in the model server"""
+
+    def __init__(self, socket_path: str):
+        self.client = ModelServerClient(socket_path)
+        self.loaded = False
+
+    def load(self) -> bool:
+        if self.loaded:
+            return True
+        try:
+            info = self.client.request("ping")
+        except ModelServerError as e:
+            print(f"Local model server unavailable: {e}")
+            return False
+        self.loaded = info.get("generator", {}).get("loaded", False)
+        return self.loaded
+
+    def generate(self, prompts: List[str]) -> List[Optional[str]]:
+        try:
+            return self.client.request("generate", prompts=prompts)["texts"]
+        except ModelServerError as e:
+            print(f"Local model error: {e}")
+            return [None] * len(prompts)
+
+    def info(self) -> dict:
+        return {"backend": "model_server", "socket": self.client.socket_path, "loaded": self.loaded}
+
+    def stats(self) -> dict:
+        """The sidecar's scheduler metrics, shared by every worker using it"""
+        try:
+            return self.client.request("ping").get("scheduler", {})
+        except ModelServerError as e:
+            return {"error": str(e)}
+
+
+class RemoteOCRReader:
+    """Stands in for easyocr.Reader; the server reads the image from the shared filesystem"""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def readtext(self, image_path: str, **kwargs) -> List[Any]:
+        return self.client.request("ocr", image_path=os.path.abspath(image_path), options=kwargs)["results"]
@@ -0,0 +1,209 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+
+class ModelHealth:
+    """Rolling health record for one model"""
+
+    def __init__(self, name: str, priority: int):
+        self.name = name
+        self.priority = priority
+        self.latency = None  # exponentially weighted moving average, seconds
+        self.error_rate = 0.0  # exponentially weighted, 0..1
+        self.successes = 0
+        self.failures = 0
+        self.rate_limits = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.open_until = 0.0
+        self.open_seconds = 0.0
+        self.half_open = False
+        self.probe_until = 0.0  # a half-open trial is in flight until then
+
+    def to_dict(self, now: float) -> Dict:
+        if now < self.cooldown_until:
+            state = "rate_limited"
+        elif now < self.open_until:
+            state = "open"
+        elif self.half_open:
+            state = "half_open"
+        else:
+            state = "closed"
+        return {
+            "model": self.name,
+            "state": state,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limits": self.rate_limits,
+            "retry_in": round(max(self.cooldown_until, self.open_until) - now, 1) if state in ("rate_limited", "open") else 0
+        }
+
+
+class ModelRouter:
+    """Routes Gemini calls to the fastest healthy model.
+
+    Tracks latency and error rate per model, parks rate-limited models for a
+    cooldown, and trips a circuit breaker after repeated failures so a
+    degraded model stops being tried on every request. After the breaker's
+    timeout one trial request is let through (half-open): the first caller
+    claims the probe slot and other callers skip the model until that request
+    reports back or ``probe_timeout`` passes; success closes it, failure
+    reopens it with a doubled timeout. Every ``probe_every`` calls the
+    highest-priority model that has never been tried is put first, so a faster
+    model further down the list is eventually discovered.
+
+    ``model_factory`` builds a model object from its name (``genai.GenerativeModel``
+    in production, any stub with ``generate_content`` in debugging).
+    """
+
+    def __init__(self, model_names: List[str], model_factory: Callable[[str], Any],
+                 rate_limit_errors: Tuple[Type[BaseException], ...] = (),
+                 failure_threshold: int = 3, open_seconds: float = 30.0,
+                 max_open_seconds: float = 600.0, rate_limit_cooldown: float = 60.0,
+                 alpha: float = 0.3, probe_every: int = 10, probe_timeout: float = 120.0):
+        self.model_factory = model_factory
+        self.rate_limit_errors = rate_limit_errors
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.alpha = alpha
+        self.probe_every = probe_every
+        self.probe_timeout = probe_timeout
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._models: Dict[str, Any] = {}
+        self._health: Dict[str, ModelHealth] = {}
+        self.set_models(model_names)
+
+    def set_models(self, model_names: List[str]):
+        """Replace the candidate list, keeping history for models that remain"""
+        with self._lock:
+            self._health = {
+                name: self._health.get(name) or ModelHealth(name, i)
+                for i, name in enumerate(model_names)
+            }
+            for name, health in self._health.items():
+                health.priority = model_names.index(name)
+
+    @property
+    def model_names(self) -> List[str]:
+        with self._lock:
+            return list(self._health)
+
+    def candidates(self) -> List[str]:
+        """Available models, fastest measured first, then the rest in priority order.
+
+        A half-open model is only returned to the caller that claims its probe
+        slot; pass the names that were never tried to ``release``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            probe = self.probe_every > 0 and self._calls % self.probe_every == 0
+            available = []
+            for h in self._health.values():
+                if now < h.cooldown_until or now < h.open_until:
+                    continue
+                if h.half_open:
+                    if now < h.probe_until:
+                        continue
+                    h.probe_until = now + self.probe_timeout
+                available.append(h)
+        measured = sorted((h for h in available if h.latency is not None),
+                          key=lambda h: (h.half_open, h.latency * (1 + h.error_rate), h.priority))
+        unmeasured = sorted((h for h in available if h.latency is None),
+                            key=lambda h: (h.half_open, h.failures > 0, h.priority))
+        ordered = measured + unmeasured
+
+        if probe:
+            untried = [h for h in unmeasured if h.successes == 0 and h.failures == 0]
+            if untried:
+                ordered.remove(untried[0])
+                ordered.insert(0, untried[0])
+        return [h.name for h in ordered]
+
+    def release(self, names: List[str]):
+        """Give back probe slots claimed by ``candidates`` for models that weren't tried"""
+        with self._lock:
+            for name in names:
+                h = self._health.get(name)
+                if h is not None:
+                    h.probe_until = 0.0
+
+    def get_model(self, name: str):
+        model = self._models.get(name)
+        if model is None:
+            model = self.model_factory(name)
+            self._models[name] = model
+        return model
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            h = self._health.get(name)
+            if h is None:
+                return
+            h.successes += 1
+            h.consecutive_failures = 0
+            h.half_open = False
+            h.probe_until = 0.0
+            h.open_seconds = 0.0
+            h.latency = latency if h.latency is None else self.alpha * latency + (1 - self.alpha) * h.latency
+            h.error_rate = (1 - self.alpha) * h.error_rate
+
+    def record_failure(self, name: str, error: Optional[BaseException] = None):
+        now = time.monotonic()
+        with self._lock:
+            h = self._health.get(name)
+            if h is None:
+                return
+            h.probe_until = 0.0
+            if error is not None and self.rate_limit_errors and isinstance(error, self.rate_limit_errors):
+                # Quota problems are not the model's fault: park it without counting a failure
+                h.rate_limits += 1
+                h.cooldown_until = now + self.rate_limit_cooldown
+                return
+
+            h.failures += 1
+            h.consecutive_failures += 1
+            h.error_rate = self.alpha + (1 - self.alpha) * h.error_rate
+            if h.half_open or h.consecutive_failures >= self.failure_threshold:
+                h.open_seconds = min(
+                    self.max_open_seconds,
+                    h.open_seconds * 2 if h.open_seconds else self.base_open_seconds
+                )
+                h.open_until = now + h.open_seconds
+                h.half_open = True
+                print(f"Circuit opened for {name} for {h.open_seconds:.0f}s")
+
+    def call(self, func: Callable[[Any, str], Optional[Any]]) -> Optional[Any]:
+        """Run func(model, model_name) on candidates until one returns a non-None result.
+
+        A None result (e.g. unparseable output) counts as a failure for that model.
+        """
+        names = self.candidates()
+        for i, name in enumerate(names):
+            start = time.monotonic()
+            try:
+                result = func(self.get_model(name), name)
+            except Exception as e:
+                print(f"Error with {name}: {e}")
+                self.record_failure(name, e)
+                continue
+
+            if result is None:
+                self.record_failure(name)
+                continue
+
+            self.record_success(name, time.monotonic() - start)
+            self.release(names[i + 1:])
+            return result
+        return None
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [h.to_dict(now) for h in sorted(self._health.values(), key=lambda h: h.priority)]
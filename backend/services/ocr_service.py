@@ -1,48 +1,105 @@
-import easyocr
 import re
 from typing import List, Optional
 import os
 import ssl
-import certifi
-import PIL.Image
-import PyPDF2
-from io import BytesIO
+import tempfile
+import threading
 
-# Fix for Pillow 10.0.0 removed ANTIALIAS
-if not hasattr(PIL.Image, 'ANTIALIAS'):
-    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+from services.extraction_cache import ExtractionCache, file_sha256
+from services.image_preprocess import ImagePreprocessor
+from services.pdf_extractor import PdfTextExtractor
+from services.vision_batcher import VISION_MODEL, VISION_PROMPT, VisionBatchExtractor
+from services.model_client import ModelServerClient, ModelServerError, RemoteOCRReader
 
-import easyocr
+# easyocr (torch), PIL, PyPDF2 and google.generativeai are imported on first
+# use so the API process starts without paying for them.
+
+
+def load_easyocr_reader():
+    import PIL.Image
+    # Fix for Pillow 10.0.0 removed ANTIALIAS
+    if not hasattr(PIL.Image, 'ANTIALIAS'):
+        PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+    import easyocr
+
+    # Fix SSL certificate issues on macOS
+    original_context = ssl._create_default_https_context
+    ssl._create_default_https_context = ssl._create_unverified_context
+    try:
+        return easyocr.Reader(['en'], gpu=False)
+    finally:
+        ssl._create_default_https_context = original_context
 
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, executor=None):
         # Lazy initialization - only initialize when needed
         print("OCR service ready (will initialize on first use)")
-        self.reader: Optional[easyocr.Reader] = None
+        self.reader = None
         self._initialized = False
+        self._init_lock = threading.Lock()
+        self._genai_configured = False
+        self.cache = ExtractionCache()
+        # Pages are cached individually, so PDFs skip the whole-file cache entry
+        self.pdf = PdfTextExtractor(self.cache, executor)
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            import google.generativeai as genai
+        # "hybrid" keeps the PDF text layer and OCRs only scanned pages;
+        # "vision" sends whole PDFs to Gemini Vision in concurrent page batches
+        self.pdf_mode = os.getenv("PDF_EXTRACTION_MODE", "hybrid").lower()
+        # Swappable for a local stub of the Vision endpoint
+        self.vision_model_factory = lambda: self._genai().GenerativeModel(VISION_MODEL)
+        self.vision = VisionBatchExtractor(lambda: self.vision_model_factory())
+        # Resolution normalization, binarization and tiling before EasyOCR
+        self.preprocess = os.getenv("OCR_PREPROCESS", "1") != "0"
+        self.preprocessor = ImagePreprocessor()
+        # EasyOCR isn't thread-safe, and requests, PDF page OCR and tiles can
+        # all reach the reader at once (model_server.py serializes the same way)
+        self._ocr_lock = threading.Lock()
+
+    def _genai(self):
+        import google.generativeai as genai
+        if not self._genai_configured:
             genai.configure(api_key=self.api_key)
+            self._genai_configured = True
+        return genai
+
+    def warm_up(self, load_reader: bool = False):
+        """Import the Gemini client ahead of the first upload, and optionally EasyOCR"""
+        if self.api_key:
+            self._genai()
+        if load_reader:
+            self._initialize_reader()
     
     def _initialize_reader(self):
         """Initialize EasyOCR reader lazily"""
         if self._initialized:
             return
         
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._load_reader()
+
+    def _load_reader(self):
+        model_server_socket = os.getenv("MODEL_SERVER_SOCKET")
+        if model_server_socket:
+            # The model server sidecar holds the only EasyOCR copy on this node
+            client = ModelServerClient(model_server_socket)
+            try:
+                if client.request("ping").get("ocr", {}).get("loaded"):
+                    self.reader = RemoteOCRReader(client)
+                    print("OCR service using model server")
+                else:
+                    print("Warning: model server has no OCR reader loaded")
+                self._initialized = True
+            except ModelServerError as e:
+                # Leave uninitialized so the next image retries the sidecar
+                print(f"Warning: Could not reach model server: {e}")
+            return
+
         try:
             print("Initializing OCR service...")
-            # Fix SSL certificate issues on macOS
-            import ssl
-            original_context = ssl._create_default_https_context
-            ssl._create_default_https_context = ssl._create_unverified_context
-            
-            try:
-                self.reader = easyocr.Reader(['en'], gpu=False)
-            finally:
-                ssl._create_default_https_context = original_context
-            
+            self.reader = load_easyocr_reader()
             self._initialized = True
             print("OCR service initialized successfully")
         except Exception as e:
@@ -50,39 +107,69 @@ class OCRService:
             self.reader = None
             self._initialized = True
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, file_hash: Optional[str] = None) -> str:
         """Extract text from image, PDF, or TXT file"""
         ext = os.path.splitext(file_path)[1].lower()
         
+        # Plain text is cheaper to read than to look up
+        if ext == '.txt':
+            return self.extract_text_from_txt(file_path)
+        
+        # Cache lookups are keyed by file content, not name
+        if self.cache.enabled and file_hash is None:
+            file_hash = file_sha256(file_path)
+        
+        # PDFs keep their text layer and only OCR the pages that lack one,
+        # instead of paying for whole-document Vision extraction
+        if ext == '.pdf':
+            if self.pdf_mode == "vision" and self.api_key:
+                try:
+                    text = self._extract_cached(file_hash, "gemini", lambda: self.extract_text_with_gemini(file_path))
+                    if text and len(text.strip()) > 10:
+                        return text
+                except Exception as e:
+                    print(f"Gemini OCR extraction failed: {e}")
+            return self.extract_text_from_pdf(file_path, file_hash)
+        
         # Try Gemini first if API key is available (it's much better than EasyOCR/PyPDF2)
         if self.api_key:
             try:
-                text = self.extract_text_with_gemini(file_path)
+                text = self._extract_cached(file_hash, "gemini", lambda: self.extract_text_with_gemini(file_path))
                 if text and len(text.strip()) > 10:
                     return text
             except Exception as e:
                 print(f"Gemini OCR extraction failed: {e}")
         
-        if ext == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif ext == '.txt':
-            return self.extract_text_from_txt(file_path)
-        else:
-            return self.extract_text_from_image(file_path)
+        return self._extract_cached(file_hash, "easyocr", lambda: self.extract_text_from_image(file_path))
+    
+    def _extract_cached(self, file_hash: Optional[str], backend: str, extract) -> str:
+        if file_hash is None:
+            return extract()
+        return self.cache.get_or_extract(file_hash, backend, extract)
     
     def extract_text_with_gemini(self, file_path: str) -> str:
         """Use Gemini to extract text from a file (Image or PDF)"""
-        import google.generativeai as genai
         print(f"Using Gemini to extract text from {file_path}...")
         
         # Support for images and PDFs
         ext = os.path.splitext(file_path)[1].lower()
-        mime_type = "application/pdf" if ext == '.pdf' else f"image/{ext[1:]}"
-        if ext == '.jpg': mime_type = "image/jpeg"
+        if ext == '.pdf':
+            # Page batches keep memory bounded and let batches run concurrently.
+            # Any failed batch makes the whole result empty: it isn't cached
+            # and extract_text falls back to the text layer + OCR path
+            try:
+                text = self.vision.extract_text(file_path)
+                print(f"Gemini extracted {len(text)} characters")
+                return text
+            except Exception as e:
+                print(f"Gemini Vision error: {e}")
+                return ""
         
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        mime_type = f"image/{ext[1:]}"
+        if ext == '.jpg': mime_type = "image/jpeg"
         
         try:
+            model = self.vision_model_factory()
             with open(file_path, "rb") as f:
                 content = f.read()
             
@@ -91,7 +178,7 @@ class OCRService:
                     "mime_type": mime_type,
                     "data": content
                 },
-                "Extract all text from this document as accurately as possible. Preserve the structure if it looks like a quiz or syllabus."
+                VISION_PROMPT
             ])
             
             text = response.text
@@ -101,6 +188,10 @@ class OCRService:
             print(f"Gemini Vision error: {e}")
             return ""
 
+    def iter_gemini_pdf_batches(self, file_path: str):
+        """Yield Gemini Vision text for each page batch, in page order (VisionBatchError if one fails)"""
+        return self.vision.iter_batches(file_path)
+
     def extract_text_from_txt(self, file_path: str) -> str:
         """Extract text from TXT file"""
         try:
@@ -122,25 +213,43 @@ class OCRService:
             print(f"TXT Extraction Error: {e}")
             return ""
 
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using PyPDF2"""
+    def extract_text_from_pdf(self, file_path: str, file_hash: Optional[str] = None) -> str:
+        """Extract text from PDF: PyPDF2 text layer in parallel, OCR for image-only pages"""
         try:
             print(f"Processing PDF: {file_path}")
-            text = ""
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-            
+            text = self.pdf.extract_text(file_path, file_hash, ocr_page=self.ocr_page_image)
             print(f"Extracted {len(text)} characters from PDF")
             return text
         except Exception as e:
             print(f"PDF Extraction Error: {e}")
             return ""
 
+    def iter_pdf_pages(self, file_path: str, file_hash: Optional[str] = None):
+        """Yield each page's text in order as soon as it has been extracted"""
+        return self.pdf.iter_pages(file_path, file_hash, ocr_page=self.ocr_page_image)
+
+    def ocr_page_image(self, png: bytes) -> str:
+        """OCR one rasterized PDF page: Gemini Vision if configured, else EasyOCR"""
+        if self.api_key:
+            try:
+                model = self.vision_model_factory()
+                response = model.generate_content([
+                    {"mime_type": "image/png", "data": png},
+                    "Extract all text from this page as accurately as possible. Preserve the structure if it looks like a quiz or syllabus."
+                ])
+                if response.text and len(response.text.strip()) > 10:
+                    return response.text
+            except Exception as e:
+                print(f"Gemini Vision page error: {e}")
+
+        # EasyOCR (local or via the model server) reads from a path
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+            f.write(png)
+        try:
+            return self.extract_text_from_image(f.name)
+        finally:
+            os.unlink(f.name)
+
     def extract_text_from_image(self, image_path: str) -> str:
         """Extract text from image using OCR"""
         self._initialize_reader()
@@ -151,128 +260,156 @@ class OCRService:
         
         try:
             print(f"Processing image: {image_path}")
+            if self.preprocess:
+                text = self._read_preprocessed(image_path)
+            else:
+                text = self._read_image(image_path, mag_ratio=1.5)
+            print(f"Extracted {len(text)} characters")
+            return text
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            return ""
+
+    def _read_preprocessed(self, image_path: str) -> str:
+        with tempfile.TemporaryDirectory(prefix="ocr-") as tmp:
+            try:
+                tiles = self.preprocessor.prepare_file(image_path, tmp)
+            except Exception as e:
+                print(f"Image preprocessing failed, reading the original: {e}")
+                return self._read_image(image_path, mag_ratio=1.5)
+
+            if len(tiles) == 1:
+                return self._read_image(tiles[0])
+            # Tiles are cut between lines of text, so their texts just
+            # concatenate; the reader takes one at a time anyway
+            texts = [self._read_image(tile) for tile in tiles]
+        return "\n\n".join(text for text in texts if text)
+
+    def _read_image(self, image_path: str, mag_ratio: float = 1.0) -> str:
+        # Preprocessed images are already at the target resolution
+        with self._ocr_lock:
             results = self.reader.readtext(
                 image_path, 
                 detail=0, 
                 paragraph=True,
-                mag_ratio=1.5,
+                mag_ratio=mag_ratio,
                 contrast_ths=0.1,
                 adjust_contrast=0.5
             )
-            text = "\n\n".join(results)
-            print(f"Extracted {len(text)} characters")
-            return text
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            return ""
+        return "\n\n".join(results)
     
     def extract_topics(self, text: str) -> List[str]:
         """Extract topics from extracted text"""
-        topics = []
-        
-        # Common patterns for syllabus topics
-        # Look for numbered lists, bullet points, chapter titles, etc.
-        
-        # Pattern 1: Numbered topics (1., 2., etc.)
-        numbered_pattern = r'\d+[\.\)]\s*([A-Z][^\n]+)'
-        matches = re.findall(numbered_pattern, text)
-        topics.extend([m.strip() for m in matches])
-        
-        # Pattern 2: Bullet points (-, *, •)
-        bullet_pattern = r'[-*•]\s*([A-Z][^\n]+)'
-        matches = re.findall(bullet_pattern, text)
-        topics.extend([m.strip() for m in matches])
-        
-        # Pattern 3: Chapter/Unit titles (Chapter X:, Unit X:, etc.)
-        chapter_pattern = r'(?:Chapter|Unit|Topic|Module)\s*\d*[:\-]?\s*([A-Z][^\n]+)'
-        matches = re.findall(chapter_pattern, text, re.IGNORECASE)
-        topics.extend([m.strip() for m in matches])
+        return extract_topics_from_text(text)
+
+
+def extract_topics_from_text(text: str) -> List[str]:
+    """Pattern-based topic extraction; module-level so it can run on the CPU pool"""
+    topics = []
+    
+    # Common patterns for syllabus topics
+    # Look for numbered lists, bullet points, chapter titles, etc.
+    
+    # Pattern 1: Numbered topics (1., 2., etc.)
+    numbered_pattern = r'\d+[\.\)]\s*([A-Z][^\n]+)'
+    matches = re.findall(numbered_pattern, text)
+    topics.extend([m.strip() for m in matches])
+    
+    # Pattern 2: Bullet points (-, *, •)
+    bullet_pattern = r'[-*•]\s*([A-Z][^\n]+)'
+    matches = re.findall(bullet_pattern, text)
+    topics.extend([m.strip() for m in matches])
+    
+    # Pattern 3: Chapter/Unit titles (Chapter X:, Unit X:, etc.)
+    chapter_pattern = r'(?:Chapter|Unit|Topic|Module)\s*\d*[:\-]?\s*([A-Z][^\n]+)'
+    matches = re.findall(chapter_pattern, text, re.IGNORECASE)
+    topics.extend([m.strip() for m in matches])
+    
+    # Pattern 4: Lines starting with capital letters (potential titles)
+    # Relaxed logic: Accept almost any line that looks like a title
+    # Also handle merged titles (e.g. "Matrix Properties of Determinants Determinant of a Matrix")
+    
+    raw_lines = text.split('\n')
+    lines = []
+    
+    # Pre-process lines to split merged titles
+    for r_line in raw_lines:
+        r_line = r_line.strip()
+        if not r_line:
+            continue
+            
+        # Clean underscores
+        if '_' in r_line:
+            r_line = r_line.replace('_', ' ')
         
-        # Pattern 4: Lines starting with capital letters (potential titles)
-        # Relaxed logic: Accept almost any line that looks like a title
-        # Also handle merged titles (e.g. "Matrix Properties of Determinants Determinant of a Matrix")
+        # 1. First, split aggressively by large spaces or CamelCase boundaries
+        temp_parts = []
         
-        raw_lines = text.split('\n')
-        lines = []
+        # Split by 3+ spaces (common in columns)
+        cols = re.split(r'\s{3,}', r_line)
+        for col in cols:
+            if len(col) > 60:
+                 # Look for: (lowercase letter) (spaces) (Capital Letter)
+                 # limit split to avoid breaking sentences
+                 sub_parts = re.split(r'(?<=[a-z])\s+(?=[A-Z][a-z])', col)
+                 temp_parts.extend(sub_parts)
+            else:
+                temp_parts.append(col)
         
-        # Pre-process lines to split merged titles
-        for r_line in raw_lines:
-            r_line = r_line.strip()
-            if not r_line:
-                continue
-                
-            # Clean underscores
-            if '_' in r_line:
-                r_line = r_line.replace('_', ' ')
+        # 2. Stitch back together parts that were split on connectors (of, a, the, etc.)
+        # e.g., "Determinant of a", "Matrix" -> "Determinant of a Matrix"
+        merged_parts = []
+        if temp_parts:
+            current_part = temp_parts[0]
+            connectors = {'of', 'a', 'an', 'the', 'and', 'or', 'for', 'to', 'in', 'with', 'by', 'using'}
             
-            # 1. First, split aggressively by large spaces or CamelCase boundaries
-            temp_parts = []
-            
-            # Split by 3+ spaces (common in columns)
-            cols = re.split(r'\s{3,}', r_line)
-            for col in cols:
-                if len(col) > 60:
-                     # Look for: (lowercase letter) (spaces) (Capital Letter)
-                     # limit split to avoid breaking sentences
-                     sub_parts = re.split(r'(?<=[a-z])\s+(?=[A-Z][a-z])', col)
-                     temp_parts.extend(sub_parts)
+            for i in range(1, len(temp_parts)):
+                next_part = temp_parts[i]
+                # Check if current part ends with a connector
+                words = current_part.strip().split()
+                if words and words[-1].lower() in connectors:
+                    # Append next part to current
+                    current_part += " " + next_part
                 else:
-                    temp_parts.append(col)
-            
-            # 2. Stitch back together parts that were split on connectors (of, a, the, etc.)
-            # e.g., "Determinant of a", "Matrix" -> "Determinant of a Matrix"
-            merged_parts = []
-            if temp_parts:
-                current_part = temp_parts[0]
-                connectors = {'of', 'a', 'an', 'the', 'and', 'or', 'for', 'to', 'in', 'with', 'by', 'using'}
-                
-                for i in range(1, len(temp_parts)):
-                    next_part = temp_parts[i]
-                    # Check if current part ends with a connector
-                    words = current_part.strip().split()
-                    if words and words[-1].lower() in connectors:
-                        # Append next part to current
-                        current_part += " " + next_part
-                    else:
-                        # Push current and start new
-                        merged_parts.append(current_part)
-                        current_part = next_part
-                merged_parts.append(current_part)
-                lines.extend(merged_parts)
+                    # Push current and start new
+                    merged_parts.append(current_part)
+                    current_part = next_part
+            merged_parts.append(current_part)
+            lines.extend(merged_parts)
 
-        topics = []
-        for line in lines:
-            line = line.strip()
-            # Filter incomplete fragments often caused by bad OCR or splitting
-            if len(line.split()) < 2 and line.lower() in {'matrix', 'formula', 'introduction'}:
-                 # Skip generic single words if they likely belong to a fuller title
-                 continue
-                 
-            if len(line) > 5 and len(line) < 100:
-                # Must start with letter, have some content
-                if line[0].isalnum():
-                    # If it's not a sentence (doesn't end in .) or it's a short "sentence" acting as title
-                    if not line.endswith('.') or len(line) < 60:
-                        topics.append(line)
-        
-        # Remove duplicates and clean
-        topics = list(set(topics))
-        topics = [t for t in topics if len(t) > 5 and len(t) < 100]
-        
-        # Filter out "topics" that are just verbs/connectors
-        bad_starts = {'how to', 'methods to', 'types of', 'properties of'}
-        final_topics = []
-        for t in topics:
-            if t.lower() in bad_starts:
-                continue
-            final_topics.append(t)
-            
-        topics = final_topics
-        
-        # If no topics found, just use the raw lines
-        if not topics:
-            print("No structured topics found, using raw lines as topics")
-            topics = [line.strip() for line in raw_lines if len(line.strip()) > 8]
+    topics = []
+    for line in lines:
+        line = line.strip()
+        # Filter incomplete fragments often caused by bad OCR or splitting
+        if len(line.split()) < 2 and line.lower() in {'matrix', 'formula', 'introduction'}:
+             # Skip generic single words if they likely belong to a fuller title
+             continue
+             
+        if len(line) > 5 and len(line) < 100:
+            # Must start with letter, have some content
+            if line[0].isalnum():
+                # If it's not a sentence (doesn't end in .) or it's a short "sentence" acting as title
+                if not line.endswith('.') or len(line) < 60:
+                    topics.append(line)
+    
+    # Remove duplicates and clean
+    topics = list(set(topics))
+    topics = [t for t in topics if len(t) > 5 and len(t) < 100]
+    
+    # Filter out "topics" that are just verbs/connectors
+    bad_starts = {'how to', 'methods to', 'types of', 'properties of'}
+    final_topics = []
+    for t in topics:
+        if t.lower() in bad_starts:
+            continue
+        final_topics.append(t)
         
-        print(f"Extracted {len(topics)} topics: {topics[:3]}...")
-        return topics[:20]  # Return top 20 topics
+    topics = final_topics
+    
+    # If no topics found, just use the raw lines
+    if not topics:
+        print("No structured topics found, using raw lines as topics")
+        topics = [line.strip() for line in raw_lines if len(line.strip()) > 8]
+    
+    print(f"Extracted {len(topics)} topics: {topics[:3]}...")
+    return topics[:20]  # Return top 20 topics
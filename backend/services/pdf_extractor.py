@@ -0,0 +1,259 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.worker_pool import PoolSaturatedError
+
+
+def page_cache_key(page_number: int) -> str:
+    return f"pypdf2:page:{page_number}"
+
+
+def ocr_cache_key(page_number: int) -> str:
+    return f"ocr:page:{page_number}"
+
+
+def count_pages(file_path: str) -> int:
+    import PyPDF2
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); runs in a worker process, so it opens the file itself"""
+    import PyPDF2
+    texts = []
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page_number in range(start, stop):
+            try:
+                texts.append(reader.pages[page_number].extract_text() or "")
+            except Exception as e:
+                print(f"PDF page {page_number + 1} extraction error: {e}")
+                texts.append("")
+    return texts
+
+
+def render_page_png(file_path: str, page_number: int, dpi: int = 200) -> Optional[bytes]:
+    """Rasterize one page to PNG; runs in a worker process.
+
+    Uses pypdfium2 when it is installed. Otherwise falls back to the page's
+    largest embedded image, which for a scanned page is the scan itself.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return _largest_embedded_image(file_path, page_number)
+
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        image = pdf[page_number].render(scale=dpi / 72).to_pil()
+    finally:
+        pdf.close()
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _largest_embedded_image(file_path: str, page_number: int) -> Optional[bytes]:
+    import PIL.Image
+    import PyPDF2
+    with open(file_path, "rb") as f:
+        page = PyPDF2.PdfReader(f).pages[page_number]
+        try:
+            images = list(page.images)
+        except Exception as e:
+            print(f"Could not read images on PDF page {page_number + 1}: {e}")
+            return None
+    if not images:
+        return None
+
+    largest = max(images, key=lambda image: len(image.data))
+    # Normalize JPEG/JPX/CMYK scans to RGB PNG for the OCR backends
+    buffer = BytesIO()
+    PIL.Image.open(BytesIO(largest.data)).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class PdfTextExtractor:
+    """Extracts PDF text page by page, spreading page ranges over the CPU process pool.
+
+    Pages are yielded in order as soon as the range containing them is done,
+    and each page's text is cached under the file hash so a repeated or
+    interrupted extraction only parses the pages it hasn't seen.
+
+    When an ``ocr_page`` callable (PNG bytes -> text) is given, pages without
+    a usable text layer are rasterized on the process pool and OCRed on a
+    small thread pool while the remaining text pages are still being parsed;
+    results are merged back in page order.
+    """
+
+    def __init__(self, cache=None, executor=None, pages_per_task: Optional[int] = None):
+        self.cache = cache
+        # ExecutorService whose cpu pool runs the page ranges; None extracts inline
+        self.executor = executor
+        self.pages_per_task = max(1, pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "8")))
+        # A page with less text than this is treated as a scan and OCRed
+        self.min_page_chars = int(os.getenv("PDF_MIN_PAGE_CHARS", "25"))
+        self.ocr_dpi = int(os.getenv("PDF_OCR_DPI", "200"))
+        self.ocr_concurrency = max(1, int(os.getenv("PDF_OCR_CONCURRENCY", "2")))
+        self._ocr_pool = None
+        self._ocr_pool_lock = threading.Lock()
+
+    def iter_pages(self, file_path: str, file_hash: Optional[str] = None,
+                   ocr_page: Optional[Callable[[bytes], str]] = None) -> Iterator[str]:
+        text_pages = self._iter_text_layer(file_path, file_hash)
+        if ocr_page is None:
+            return text_pages
+        return self._merge_ocr(file_path, file_hash, text_pages, ocr_page)
+
+    def _iter_text_layer(self, file_path: str, file_hash: Optional[str]) -> Iterator[str]:
+        num_pages = count_pages(file_path)
+        use_cache = self.cache is not None and self.cache.enabled and file_hash is not None
+
+        cached: Dict[int, str] = {}
+        if use_cache:
+            found = self.cache.get_many(file_hash, [page_cache_key(i) for i in range(num_pages)])
+            cached = {i: found[page_cache_key(i)] for i in range(num_pages) if page_cache_key(i) in found}
+
+        ranges = self._missing_ranges(num_pages, cached)
+        pending = self._submit(file_path, ranges)
+        try:
+            page_number = 0
+            for start, stop in ranges:
+                # Cached pages before this range go out immediately
+                while page_number < start:
+                    yield cached[page_number]
+                    page_number += 1
+
+                texts = self._collect(file_path, start, stop, pending.pop(start, None))
+                if use_cache:
+                    self.cache.put_many(file_hash, {
+                        page_cache_key(start + offset): text for offset, text in enumerate(texts)
+                    })
+                for text in texts:
+                    yield text
+                page_number = stop
+
+            while page_number < num_pages:
+                yield cached[page_number]
+                page_number += 1
+        finally:
+            # The consumer may stop early; don't leave queued ranges running
+            for future in pending.values():
+                future.cancel()
+
+    def extract_text(self, file_path: str, file_hash: Optional[str] = None,
+                     ocr_page: Optional[Callable[[bytes], str]] = None) -> str:
+        return "".join(text + "\n\n" for text in self.iter_pages(file_path, file_hash, ocr_page) if text)
+
+    def needs_ocr(self, text: str) -> bool:
+        return len(text.strip()) < self.min_page_chars
+
+    def _merge_ocr(self, file_path: str, file_hash: Optional[str], text_pages: Iterator[str],
+                   ocr_page: Callable[[bytes], str]) -> Iterator[str]:
+        use_cache = self.cache is not None and self.cache.enabled and file_hash is not None
+        # (page_number, text layer, OCR future or None) in page order
+        window = deque()
+        ocr_count = 0
+        try:
+            for page_number, text in enumerate(text_pages):
+                future = None
+                if self.needs_ocr(text):
+                    cached = self.cache.get(file_hash, ocr_cache_key(page_number)) if use_cache else None
+                    if cached is not None:
+                        text = cached
+                    else:
+                        future = self._get_ocr_pool().submit(self._ocr_page, file_path, page_number, ocr_page)
+                        ocr_count += 1
+                window.append((page_number, text, future))
+
+                # Hand out everything at the front that is already finished
+                while window and (window[0][2] is None or window[0][2].done()):
+                    yield self._resolve(window.popleft(), file_hash, use_cache)
+
+            while window:
+                yield self._resolve(window.popleft(), file_hash, use_cache)
+        finally:
+            text_pages.close()
+            for _, _, future in window:
+                if future is not None:
+                    future.cancel()
+            if ocr_count:
+                print(f"OCRed {ocr_count} image-only PDF page(s)")
+
+    def _resolve(self, entry: Tuple[int, str, Optional[Future]], file_hash: Optional[str], use_cache: bool) -> str:
+        page_number, text, future = entry
+        if future is None:
+            return text
+        try:
+            ocr_text = future.result()
+        except Exception as e:
+            print(f"OCR failed on PDF page {page_number + 1}: {e}")
+            ocr_text = ""
+        if not ocr_text.strip():
+            # Keep whatever little text layer there was
+            return text
+        if use_cache:
+            self.cache.put(file_hash, ocr_cache_key(page_number), ocr_text)
+        return ocr_text
+
+    def _ocr_page(self, file_path: str, page_number: int, ocr_page: Callable[[bytes], str]) -> str:
+        png = None
+        if self.executor is not None:
+            try:
+                png = self.executor.cpu.submit(render_page_png, file_path, page_number, self.ocr_dpi).result()
+            except PoolSaturatedError:
+                pass
+        if png is None:
+            png = render_page_png(file_path, page_number, self.ocr_dpi)
+        if png is None:
+            print(f"PDF page {page_number + 1} has no text layer and no image to OCR")
+            return ""
+        return ocr_page(png)
+
+    def _get_ocr_pool(self) -> ThreadPoolExecutor:
+        if self._ocr_pool is None:
+            with self._ocr_pool_lock:
+                if self._ocr_pool is None:
+                    self._ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_concurrency, thread_name_prefix="pdf-ocr")
+        return self._ocr_pool
+
+    def _missing_ranges(self, num_pages: int, cached: Dict[int, str]) -> List[Tuple[int, int]]:
+        """Runs of uncached pages, split into chunks of at most pages_per_task"""
+        ranges = []
+        start = None
+        for page_number in range(num_pages + 1):
+            missing = page_number < num_pages and page_number not in cached
+            if missing and start is None:
+                start = page_number
+            at_limit = start is not None and page_number - start == self.pages_per_task
+            if start is not None and (not missing or at_limit):
+                ranges.append((start, page_number))
+                start = page_number if missing else None
+        return ranges
+
+    def _submit(self, file_path: str, ranges: List[Tuple[int, int]]) -> Dict:
+        # A single range gains nothing from another process, only pickling overhead
+        if self.executor is None or len(ranges) < 2:
+            return {}
+
+        pending = {}
+        for start, stop in ranges:
+            try:
+                pending[start] = self.executor.cpu.submit(extract_page_range, file_path, start, stop)
+            except PoolSaturatedError:
+                # Whatever doesn't fit in the pool is extracted inline when reached
+                break
+        return pending
+
+    def _collect(self, file_path: str, start: int, stop: int, future) -> List[str]:
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"PDF worker failed on pages {start + 1}-{stop}, retrying inline: {e}")
+        return extract_page_range(file_path, start, stop)
@@ -0,0 +1,128 @@
+import os
+from typing import Dict, List, Tuple
+
+from database.database import question_hash
+
+
+class QuestionBankService:
+    """Assembles quizzes from previously validated questions, generating only the gap"""
+
+    def __init__(self, db, quiz_generator):
+        self.db = db
+        self.quiz_generator = quiz_generator
+        # Stop reusing a question once it has been served this many times
+        self.max_serves = int(os.getenv("QUESTION_BANK_MAX_SERVES", "3"))
+
+    def assemble_quiz(self, session: Dict, num_questions: int, difficulty: str,
+                      bloom_level: str, question_type: str) -> Dict:
+        """Build a quiz from the session's question bank, topping it up with fresh questions"""
+        session_id = session["session_id"]
+        topics = session["topics"]
+
+        questions, short_topics = self._sample(session, num_questions, difficulty, bloom_level, question_type)
+        from_bank = len(questions)
+        gap = num_questions - from_bank
+        print(f"Question bank supplied {from_bank}/{num_questions} questions")
+
+        quiz = None
+        if gap > 0:
+            quiz = self.quiz_generator.generate_quiz(
+                topics=short_topics,
+                context=session.get("extracted_text", ""),
+                num_questions=gap,
+                difficulty=difficulty,
+                bloom_level=bloom_level,
+                question_type=question_type
+            )
+            generated = self._dedupe(quiz["questions"], questions)
+
+            # Only Gemini output passes _validate_question; template and
+            # local fallbacks are served but never banked. Extras beyond the
+            # gap go in unserved, so the next quiz picks them up first
+            if quiz.get("generator") == "gemini":
+                self.db.add_to_question_bank(session_id, generated[:gap], difficulty, bloom_level, question_type)
+                self.db.add_to_question_bank(session_id, generated[gap:], difficulty, bloom_level, question_type,
+                                             served=False)
+
+            questions = questions + generated[:gap]
+
+        return {
+            "questions": questions,
+            "difficulty": difficulty,
+            "bloom_level": bloom_level,
+            "question_type": question_type,
+            "topic_count": len(topics),
+            "generator": quiz.get("generator") if quiz else "bank",
+            "from_bank": from_bank
+        }
+
+    def stream_quiz(self, session: Dict, num_questions: int, difficulty: str,
+                    bloom_level: str, question_type: str):
+        """Yield banked questions immediately, then stream freshly generated ones for the gap"""
+        session_id = session["session_id"]
+        banked, short_topics = self._sample(session, num_questions, difficulty, bloom_level, question_type)
+        for q in banked:
+            yield q
+
+        gap = num_questions - len(banked)
+        if gap <= 0:
+            return
+
+        seen = {question_hash(q) for q in banked}
+        fresh = []
+        for generator, q in self.quiz_generator.stream_quiz(
+            topics=short_topics,
+            context=session.get("extracted_text", ""),
+            num_questions=gap,
+            difficulty=difficulty,
+            bloom_level=bloom_level,
+            question_type=question_type
+        ):
+            h = question_hash(q)
+            if h in seen:
+                continue
+            seen.add(h)
+            if generator == "gemini":
+                fresh.append(q)
+            yield q
+
+        if fresh:
+            self.db.add_to_question_bank(session_id, fresh, difficulty, bloom_level, question_type)
+
+    def _sample(self, session: Dict, num_questions: int, difficulty: str,
+                bloom_level: str, question_type: str) -> Tuple[List[Dict], List[str]]:
+        """Banked questions filling each topic's quota, and the topics still short of theirs"""
+        quotas = self._topic_quotas(session["topics"], num_questions, session.get("weak_topics") or [])
+        sampled = self.db.sample_question_bank(
+            session["session_id"], question_type, difficulty, bloom_level,
+            quotas=quotas,
+            max_serves=self.max_serves
+        )
+        questions = [q for topic in quotas for q in sampled.get(topic, [])]
+        short_topics = [topic for topic, quota in quotas.items() if len(sampled.get(topic, [])) < quota]
+        return questions, short_topics or session["topics"]
+
+    def _topic_quotas(self, topics: List[str], num_questions: int, weak_topics: List[str]) -> Dict[str, int]:
+        """Split the quiz across topics, weak topics weighted double, in the session's topic order"""
+        topics = list(dict.fromkeys(topics))
+        if not topics:
+            return {}
+        weak = set(weak_topics)
+        weights = [2 if topic in weak else 1 for topic in topics]
+        total = sum(weights)
+        quotas = {topic: num_questions * w // total for topic, w in zip(topics, weights)}
+        # Hand the rounding remainder to the earliest topics (weakest first in adaptive mode)
+        remainder = num_questions - sum(quotas.values())
+        for topic in topics[:remainder]:
+            quotas[topic] += 1
+        return quotas
+
+    def _dedupe(self, generated: List[Dict], existing: List[Dict]) -> List[Dict]:
+        seen = {question_hash(q) for q in existing}
+        unique = []
+        for q in generated:
+            h = question_hash(q)
+            if h not in seen:
+                seen.add(h)
+                unique.append(q)
+        return unique
@@ -1,144 +1,357 @@
-import google.generativeai as genai
 import os
 import json
 import re
 from typing import List, Dict, Optional
 import traceback
 import time
-from google.api_core import exceptions
-import torch
-from transformers import T5ForConditionalGeneration, T5Tokenizer
 import random
 import requests
 import html
+import hashlib
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.cache import TTLCache
+from services.stream_parser import JsonArrayStreamParser
+from services.model_router import ModelRouter
+from services.local_backend import LocalGenerator
+from services.micro_batcher import MicroBatcher
+from services.model_client import RemoteLocalGenerator
+
+# google.generativeai, torch and transformers take seconds to import, so they
+# are loaded on first use (or by warm_up) instead of when the API starts.
+
+
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+
+def _generation_config(**kwargs):
+    return _genai().types.GenerationConfig(**kwargs)
+
 
 class QuizGenerator:
     def __init__(self):
         print("Initializing Enhanced Quiz Generator with Gemini API...")
         self.api_key = os.getenv("GEMINI_API_KEY")
         self.models_to_try = []
+        self.model_list_cache_path = os.getenv("MODEL_LIST_CACHE", "model_list_cache.json")
+        self.model_list_cache_ttl = float(os.getenv("MODEL_LIST_CACHE_TTL", "86400"))
+        self._warm_lock = threading.Lock()
+        self.ready = threading.Event()
 
         if not self.api_key:
             print("WARNING: GEMINI_API_KEY not found in environment variables.")
+            self.ready.set()
+
+        # Health-aware routing across the prioritized model list
+        self.router = ModelRouter(
+            [],
+            model_factory=lambda name: _genai().GenerativeModel(name),
+            failure_threshold=int(os.getenv("MODEL_FAILURE_THRESHOLD", "3")),
+            open_seconds=float(os.getenv("MODEL_CIRCUIT_OPEN_SECONDS", "30")),
+            rate_limit_cooldown=float(os.getenv("MODEL_RATE_LIMIT_COOLDOWN", "60"))
+        )
+
+        # Identical syllabi pasted by a whole cohort resolve without an LLM call
+        self.topic_cache = TTLCache(
+            max_entries=int(os.getenv("TOPIC_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("TOPIC_CACHE_TTL", "86400"))
+        )
+
+        # Large quizzes are split into chunks generated concurrently; the pool
+        # is shared by all requests so it also caps total in-flight Gemini calls
+        self.chunk_size = int(os.getenv("GEMINI_CHUNK_SIZE", "5"))
+        self.gemini_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+            thread_name_prefix="gemini"
+        )
+
+        # Local AI State (fallback): the shared model server sidecar when
+        # MODEL_SERVER_SOCKET is set, otherwise in-process behind a scheduler
+        # that coalesces concurrent requests into shared batches
+        model_server_socket = os.getenv("MODEL_SERVER_SOCKET")
+        if model_server_socket:
+            self.local = RemoteLocalGenerator(model_server_socket)
         else:
+            self.local = MicroBatcher(LocalGenerator())
+
+    def warm_up(self):
+        """Configure Gemini and resolve the model priority list (safe to call repeatedly)"""
+        if self.ready.is_set():
+            return
+        with self._warm_lock:
+            if self.ready.is_set():
+                return
             try:
+                genai = _genai()
+                from google.api_core import exceptions
                 genai.configure(api_key=self.api_key)
-                
-                # List available models
-                available_models = []
-                try:
-                    for m in genai.list_models():
-                        if 'generateContent' in m.supported_generation_methods:
-                            available_models.append(m.name)
-                    print(f"Available models: {available_models}")
-                except Exception as e:
-                    print(f"Could not list models: {e}")
-                    available_models = ["models/gemini-1.5-flash", "models/gemini-pro"]
-
-                # Build prioritized list - prefer lite/flash models for speed
-                candidates = [
-                    "gemini-2.0-flash-lite",  # Fastest
-                    "gemini-2.0-flash",
-                    "gemini-1.5-flash", 
-                    "gemini-flash",
-                    "gemini-1.5-pro",
-                    "gemini-pro"
-                ]
-                
-                self.models_to_try = []
-                for candidate in candidates:
-                    for m in available_models:
-                        if candidate in m and m not in self.models_to_try:
-                            self.models_to_try.append(m)
-                
-                for m in available_models:
-                    if m not in self.models_to_try:
-                        self.models_to_try.append(m)
-                
-                if not self.models_to_try:
-                    self.models_to_try = ["models/gemini-1.5-flash", "models/gemini-pro"]
-                    
+                self.router.rate_limit_errors = (exceptions.ResourceExhausted,)
+                self.models_to_try = self._prioritize_models(self._list_models())
+                self.router.set_models(self.models_to_try)
                 print(f"Model priority list: {self.models_to_try}")
-                
             except Exception as e:
                 print(f"Error configuring Gemini API: {e}")
                 self.models_to_try = []
+            finally:
+                self.ready.set()
 
-        # Local AI State (fallback)
-        self.local_tokenizer = None
-        self.local_model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Local AI will use device: {self.device}")
+    def _gemini_available(self) -> bool:
+        """Block until warm-up has finished, then report whether Gemini can be used"""
+        if self.api_key and not self.ready.is_set():
+            self.warm_up()
+        return bool(self.models_to_try)
+
+    def _list_models(self) -> List[str]:
+        """Available generateContent models, from the on-disk cache when it is fresh"""
+        try:
+            with open(self.model_list_cache_path, "r") as f:
+                cached = json.load(f)
+            if time.time() - cached["fetched_at"] < self.model_list_cache_ttl and cached["models"]:
+                print(f"Using cached model list ({len(cached['models'])} models)")
+                return cached["models"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # List available models
+        available_models = []
+        try:
+            for m in _genai().list_models():
+                if 'generateContent' in m.supported_generation_methods:
+                    available_models.append(m.name)
+            print(f"Available models: {available_models}")
+        except Exception as e:
+            print(f"Could not list models: {e}")
+            return ["models/gemini-1.5-flash", "models/gemini-pro"]
+
+        try:
+            with open(self.model_list_cache_path, "w") as f:
+                json.dump({"fetched_at": time.time(), "models": available_models}, f)
+        except OSError as e:
+            print(f"Could not write model list cache: {e}")
+        return available_models
+
+    def _prioritize_models(self, available_models: List[str]) -> List[str]:
+        # Build prioritized list - prefer lite/flash models for speed
+        candidates = [
+            "gemini-2.0-flash-lite",  # Fastest
+            "gemini-2.0-flash",
+            "gemini-1.5-flash", 
+            "gemini-flash",
+            "gemini-1.5-pro",
+            "gemini-pro"
+        ]
+        
+        models = []
+        for candidate in candidates:
+            for m in available_models:
+                if candidate in m and m not in models:
+                    models.append(m)
+        
+        for m in available_models:
+            if m not in models:
+                models.append(m)
+        
+        if not models:
+            models = ["models/gemini-1.5-flash", "models/gemini-pro"]
+        return models
 
     def _init_local_model(self):
         """Lazy initialization of local AI model"""
-        if self.local_model is None:
-            try:
-                print("Loading local AI model (google/flan-t5-base)...")
-                model_name = "google/flan-t5-base"  # Upgraded from small
-                self.local_tokenizer = T5Tokenizer.from_pretrained(model_name)
-                self.local_model = T5ForConditionalGeneration.from_pretrained(model_name).to(self.device)
-                print("Local AI model loaded successfully")
-            except Exception as e:
-                print(f"Error loading local model: {e}")
-                return False
-        return True
+        return self.local.load()
 
     def generate_quiz(self, topics: List[str], context: str = "", num_questions: int = 10, difficulty: str = "medium", bloom_level: str = "Mixed", question_type: str = "mcq") -> Dict:
         """Generate high-quality quiz questions using AI"""
         print(f"Generating {num_questions} {question_type} questions ({bloom_level}) for topics: {topics[:3]}...")
         
         # Try Gemini first (primary - best quality)
-        if self.models_to_try:
-            result = self._generate_with_gemini(topics, context, num_questions, difficulty, bloom_level, question_type)
+        if self._gemini_available():
+            if self.chunk_size > 0 and num_questions > self.chunk_size:
+                result = self._generate_with_gemini_chunked(topics, context, num_questions, difficulty, bloom_level, question_type)
+            else:
+                result = self._generate_with_gemini(topics, context, num_questions, difficulty, bloom_level, question_type)
             if result and len(result.get("questions", [])) >= num_questions // 2:
+                result["generator"] = "gemini"
                 return result
         
         # Try external trivia for general knowledge (secondary)
         if not context or len(context.strip()) < 100:
             external = self._fetch_external_trivia(num_questions)
             if external:
-                return external
+                external["generator"] = "trivia"
+                return self._tag_topics(external, topics)
         
         # Local AI fallback (tertiary)
         if self._init_local_model():
             print("Using local AI for question generation...")
-            return self._generate_local_quiz(topics, context, num_questions, difficulty, bloom_level)
+            result = self._generate_local_quiz(topics, context, num_questions, difficulty, bloom_level)
+            result["generator"] = "local"
+            return self._tag_topics(result, topics)
             
         # Last resort fallback
         print("All AI attempts failed. Using enhanced rule-based fallback.")
-        return self._generate_fallback_quiz(topics, num_questions, difficulty)
+        result = self._generate_fallback_quiz(topics, num_questions, difficulty)
+        result["generator"] = "template"
+        return self._tag_topics(result, topics)
 
     def _generate_with_gemini(self, topics: List[str], context: str, num_questions: int, difficulty: str, bloom_level: str, question_type: str) -> Optional[Dict]:
         """Generate questions using Gemini with enhanced Chain-of-Thought prompting"""
         
         prompt = self._create_enhanced_prompt(topics, context, num_questions, difficulty, bloom_level, question_type)
         
-        for model_name in self.models_to_try:
+        def attempt(model, model_name):
             print(f"Attempting generation with model: {model_name}")
-            for attempt in range(2):
+            response = model.generate_content(
+                prompt,
+                generation_config=_generation_config(
+                    temperature=0.7,
+                    top_p=0.9,
+                    max_output_tokens=4096
+                )
+            )
+            result = self._parse_gemini_response(response.text, topics, difficulty, bloom_level, question_type)
+            if result and result.get("questions"):
+                print(f"Successfully generated {len(result['questions'])} questions with {model_name}")
+                return result
+            return None
+        
+        return self.router.call(attempt)
+
+    def stream_quiz(self, topics: List[str], context: str = "", num_questions: int = 10, difficulty: str = "medium", bloom_level: str = "Mixed", question_type: str = "mcq"):
+        """Yield (generator, question) pairs as soon as each question has been parsed and validated"""
+        yielded = 0
+        seen = set()
+        
+        prompt = self._create_enhanced_prompt(topics, context, num_questions, difficulty, bloom_level, question_type)
+        candidates = self.router.candidates() if self._gemini_available() else []
+        # Half-open models hand out one probe slot; give back every one whose
+        # outcome isn't recorded, including the model streaming when the
+        # client disconnects (GeneratorExit skips the record below)
+        settled = 0
+        try:
+            for model_name in candidates:
+                print(f"Streaming generation with model: {model_name}")
+                parser = JsonArrayStreamParser()
+                start = time.monotonic()
+                first_question_at = None
+                error = None
                 try:
-                    model = genai.GenerativeModel(model_name)
+                    model = self.router.get_model(model_name)
                     response = model.generate_content(
                         prompt,
-                        generation_config=genai.types.GenerationConfig(
+                        generation_config=_generation_config(
                             temperature=0.7,
                             top_p=0.9,
                             max_output_tokens=4096
-                        )
+                        ),
+                        stream=True
                     )
-                    result = self._parse_gemini_response(response.text, topics, difficulty, bloom_level, question_type)
-                    if result and result.get("questions"):
-                        print(f"Successfully generated {len(result['questions'])} questions with {model_name}")
-                        return result
-                except exceptions.ResourceExhausted:
-                    print(f"Rate limit hit for {model_name}.")
-                    break
+                    for chunk in response:
+                        for q in parser.feed(chunk.text):
+                            if yielded >= num_questions:
+                                break
+                            if not self._validate_question(q, question_type):
+                                print(f"Filtered out invalid question: {str(q.get('question', 'N/A'))[:50]}...")
+                                continue
+                            key = " ".join(str(q["question"]).lower().split())
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            q["question_type"] = question_type
+                            q["topic"] = self._match_topic(q, topics)
+                            yielded += 1
+                            if first_question_at is None:
+                                first_question_at = time.monotonic()
+                            yield "gemini", q
+                        if yielded >= num_questions:
+                            break
                 except Exception as e:
-                    print(f"Error with {model_name}: {e}")
-                    if attempt == 0:
-                        time.sleep(1)
-        return None
+                    print(f"Streaming error with {model_name}: {e}")
+                    error = e
+            
+                # Time to first question is what a streaming client waits on
+                if first_question_at is not None:
+                    self.router.record_success(model_name, first_question_at - start)
+                else:
+                    self.router.record_failure(model_name, error)
+                settled += 1
+            
+                if yielded >= num_questions // 2 and yielded > 0:
+                    return
+                # Switching models after a partial stream would repeat its questions,
+                # so only retry while nothing has been sent yet
+                if yielded:
+                    break
+        finally:
+            self.router.release(candidates[settled:])
+        
+        # Non-streaming fallbacks (trivia, local model, templates) for whatever is still missing
+        remaining = num_questions - yielded
+        if remaining > 0:
+            quiz = self.generate_quiz(topics, context, remaining, difficulty, bloom_level, question_type)
+            for q in quiz["questions"]:
+                yield quiz.get("generator", "template"), q
+
+    def _generate_with_gemini_chunked(self, topics: List[str], context: str, num_questions: int, difficulty: str, bloom_level: str, question_type: str) -> Optional[Dict]:
+        """Split a large quiz into topic-grouped chunks and generate them concurrently"""
+        num_chunks = math.ceil(num_questions / self.chunk_size)
+        
+        # Round-robin topics into one group per chunk so chunks don't overlap
+        if topics:
+            groups = [topics[i::num_chunks] or [topics[i % len(topics)]] for i in range(num_chunks)]
+        else:
+            groups = [[] for _ in range(num_chunks)]
+        counts = [num_questions // num_chunks + (1 if i < num_questions % num_chunks else 0) for i in range(num_chunks)]
+        print(f"Generating {num_questions} questions in {num_chunks} concurrent chunks")
+        
+        futures = {
+            self.gemini_pool.submit(
+                self._generate_with_gemini, group, context, count, difficulty, bloom_level, question_type
+            ): i
+            for i, (group, count) in enumerate(zip(groups, counts))
+        }
+        
+        chunk_results = [None] * num_chunks
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                chunk_results[index] = future.result()
+            except Exception as e:
+                print(f"Chunk {index + 1}/{num_chunks} failed: {e}")
+        
+        # Merge in chunk order, dropping duplicates across chunks
+        questions = []
+        seen = set()
+        failed = 0
+        for result in chunk_results:
+            if not result or not result.get("questions"):
+                failed += 1
+                continue
+            for q in result["questions"]:
+                key = " ".join(str(q.get("question", "")).lower().split())
+                if key not in seen:
+                    seen.add(key)
+                    questions.append(q)
+        
+        if failed:
+            print(f"{failed}/{num_chunks} chunks failed, returning {len(questions)} questions")
+        if not questions:
+            return None
+        
+        # Chunk prompts only see their own topic group, so re-map against the full list
+        for q in questions:
+            q["topic"] = self._match_topic(q, topics)
+        
+        return {
+            "questions": questions[:num_questions],
+            "difficulty": difficulty,
+            "bloom_level": bloom_level,
+            "question_type": question_type,
+            "topic_count": len(topics)
+        }
 
     def _create_enhanced_prompt(self, topics: List[str], context: str, num_questions: int, difficulty: str, bloom_level: str, question_type: str) -> str:
         """Create an enhanced Chain-of-Thought prompt for high-quality question generation"""
@@ -207,6 +420,7 @@ QUESTION TYPE: {question_type.upper()}
 2. **UNAMBIGUOUS ANSWERS**: Only one answer should be definitively correct.
 3. **NO TRICKS**: Avoid trick questions.
 4. **CONTEXT-GROUNDED**: If context is provided, questions MUST be answerable from that context.
+5. **TOPIC TAG**: Set "topic" to the single listed topic the question tests, copied exactly.
 
 === OUTPUT FORMAT ===
 
@@ -218,7 +432,8 @@ For MCQ:
     "question": "Question text?",
     "options": ["Option text 1", "Option text 2", "Option text 3", "Option text 4"],
     "correct_answer": 0,
-    "question_type": "mcq"
+    "question_type": "mcq",
+    "topic": "Topic from the list"
   }}
 ]
 
@@ -227,7 +442,8 @@ For FILL_UPS:
   {{
     "question": "The ____ is the brain of the computer.",
     "correct_answer": "CPU",
-    "question_type": "fill_ups"
+    "question_type": "fill_ups",
+    "topic": "Topic from the list"
   }}
 ]
 
@@ -236,7 +452,8 @@ For SHORT_ANSWER:
   {{
     "question": "What is the purpose of a compiler?",
     "correct_answer": "translates, code, high-level, machine language",
-    "question_type": "short_answer"
+    "question_type": "short_answer",
+    "topic": "Topic from the list"
   }}
 ]
 
@@ -247,7 +464,13 @@ Generate exactly {num_questions} questions now:'''
         print(f"Extracting topics from context (length: {len(context)})...")
         context_preview = context[:8000]
         
-        if self.models_to_try:
+        cache_key = self._topic_cache_key(context_preview)
+        cached = self.topic_cache.get(cache_key)
+        if cached is not None:
+            print(f"Topic cache hit ({len(cached)} topics)")
+            return list(cached)
+        
+        if self._gemini_available():
             prompt = f'''Analyze this academic text and extract specific, testable topics.
 
 TEXT:
@@ -266,34 +489,48 @@ EXTRACTION RULES:
 Return ONLY a JSON array of strings. No explanation.
 Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]'''
             
-            for model_name in self.models_to_try:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    
-                    match = re.search(r'\[.*\]', response.text, re.DOTALL)
-                    if match:
-                        topics = json.loads(match.group())
-                        if topics and isinstance(topics, list):
-                            # Clean up topics
-                            cleaned = []
-                            for t in topics:
-                                if isinstance(t, str):
-                                    t = re.sub(r'^(Topic|Unit|Chapter|Module|Section)\s*\d*[:\.-]?\s*', '', t, flags=re.IGNORECASE)
-                                    t = re.sub(r'^\d+[\)\.]\s*', '', t)
-                                    t = t.strip()
-                                    if len(t) > 3 and t not in cleaned:
-                                        cleaned.append(t)
-                            
-                            print(f"Extracted {len(cleaned)} topics: {cleaned[:5]}...")
+            def attempt(model, model_name):
+                response = model.generate_content(prompt)
+                
+                match = re.search(r'\[.*\]', response.text, re.DOTALL)
+                if match:
+                    topics = json.loads(match.group())
+                    if topics and isinstance(topics, list):
+                        # Clean up topics
+                        cleaned = []
+                        for t in topics:
+                            if isinstance(t, str):
+                                t = re.sub(r'^(Topic|Unit|Chapter|Module|Section)\s*\d*[:\.-]?\s*', '', t, flags=re.IGNORECASE)
+                                t = re.sub(r'^\d+[\)\.]\s*', '', t)
+                                t = t.strip()
+                                if len(t) > 3 and t not in cleaned:
+                                    cleaned.append(t)
+                        
+                        if cleaned:
+                            print(f"Extracted {len(cleaned)} topics with {model_name}: {cleaned[:5]}...")
                             return cleaned[:25]
-                except Exception as e:
-                    print(f"Topic extraction error with {model_name}: {e}")
-                    continue
+                return None
+            
+            cleaned = self.router.call(attempt)
+            if cleaned:
+                self.topic_cache.set(cache_key, tuple(cleaned))
+                return cleaned
 
         # Fallback: Extract key terms using NLP patterns
         return self._extract_topics_regex(context_preview)
 
+    def _topic_cache_key(self, text: str) -> str:
+        """Hash of the text with case, punctuation and whitespace differences removed"""
+        normalized = re.sub(r'[^\w\s]', ' ', text.lower())
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def invalidate_topics(self, context: Optional[str] = None) -> int:
+        """Drop cached topics for one text, or the whole cache when no text is given"""
+        if context is None:
+            return self.topic_cache.clear()
+        return int(self.topic_cache.invalidate(self._topic_cache_key(context[:8000])))
+
     def _extract_topics_regex(self, text: str) -> List[str]:
         """Fallback topic extraction using regex patterns"""
         # Find capitalized terms, technical terms, etc.
@@ -335,6 +572,7 @@ Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]
                 if self._validate_question(q, question_type):
                     # Ensure question_type is set
                     q["question_type"] = question_type
+                    q["topic"] = self._match_topic(q, topics)
                     valid_questions.append(q)
                 else:
                     print(f"Filtered out invalid question: {q.get('question', 'N/A')[:50]}...")
@@ -356,6 +594,33 @@ Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]
             print(f"Parse error: {e}")
             return None
 
+    def _tag_topics(self, result: Dict, topics: List[str]) -> Dict:
+        """Give fallback questions the topic tag Gemini questions already carry"""
+        for q in result.get("questions", []):
+            if "topic" not in q:
+                q["topic"] = self._match_topic(q, topics)
+        return result
+
+    def _match_topic(self, q: Dict, topics: List[str]) -> Optional[str]:
+        """Map a question to one of the session topics"""
+        claimed = q.get("topic")
+        if isinstance(claimed, str):
+            for topic in topics:
+                if topic.lower() == claimed.strip().lower():
+                    return topic
+        
+        # Fall back to the topic sharing the most significant words with the question
+        text = str(q.get("question", "")).lower()
+        if isinstance(q.get("options"), list):
+            text += " " + " ".join(str(o) for o in q["options"]).lower()
+        best_topic, best_score = None, 0
+        for topic in topics:
+            words = [w for w in re.findall(r'\w+', topic.lower()) if len(w) > 3]
+            score = sum(1 for w in words if w in text)
+            if score > best_score:
+                best_topic, best_score = topic, score
+        return best_topic
+
     def _validate_question(self, q: Dict, expected_type: str) -> bool:
         """Validate a single question for quality"""
         # Required fields
@@ -398,32 +663,26 @@ Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]
         
         questions = []
         all_terms = self._extract_complex_terms(context)
+        selected = segments[:min(num_questions, len(segments))]
         
-        for i in range(min(num_questions, len(segments))):
-            seg = segments[i]
-            
+        # Generate all question stems using T5, a padded batch at a time
+        prompts = [f"Generate a quiz question about: {seg[:200]}" for seg in selected]
+        generated = self.local.generate(prompts)
+        
+        for i, seg in enumerate(selected):
             # Extract key term from segment
             seg_terms = self._extract_complex_terms(seg)
             anchor = seg_terms[0] if seg_terms else (topics[i % len(topics)] if topics else "concept")
             
-            # Generate question using T5
-            q_prompt = f"Generate a quiz question about: {seg[:200]}"
-            
-            try:
-                inputs = self.local_tokenizer(q_prompt, return_tensors="pt", max_length=256, truncation=True).to(self.device)
-                with torch.no_grad():
-                    outputs = self.local_model.generate(**inputs, max_length=64, do_sample=True, temperature=0.8)
-                question_text = self.local_tokenizer.decode(outputs[0], skip_special_tokens=True)
-                
+            question_text = generated[i]
+            if question_text is None:
+                question_text = f"What is the key characteristic of {anchor}?"
+            else:
                 if len(question_text) < 20:
                     question_text = f"What is the significance of {anchor} in the context of this material?"
                 
                 if not question_text.endswith("?"):
                     question_text += "?"
-                
-            except Exception as e:
-                print(f"Local model error: {e}")
-                question_text = f"What is the key characteristic of {anchor}?"
             
             # Generate plausible distractors from related terms
             correct_answer = anchor
@@ -524,7 +783,8 @@ Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]
             questions.append({
                 "question": question_text,
                 "options": options,
-                "correct_answer": 0  # First option after shuffle
+                "correct_answer": 0,  # First option after shuffle
+                "topic": topic if topics else None
             })
             
         return {
@@ -560,16 +820,17 @@ Example: ["Backpropagation", "Gradient Descent", "Learning Rate", "Overfitting"]
         '''
         
         # Try Gemini first
-        if self.models_to_try:
-            for model_name in self.models_to_try:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    result = self._parse_gemini_response(response.text, ["parsed_content"], "mixed", "Mixed", "mcq")
-                    if result and result.get("questions"):
-                        return result
-                except Exception as e:
-                    print(f"Parse error with {model_name}: {e}")
+        if self._gemini_available():
+            def attempt(model, model_name):
+                response = model.generate_content(prompt)
+                result = self._parse_gemini_response(response.text, ["parsed_content"], "mixed", "Mixed", "mcq")
+                if result and result.get("questions"):
+                    return result
+                return None
+            
+            result = self.router.call(attempt)
+            if result:
+                return result
                     
         # Fallback for parsing (simple regex if AI fails currently not implemented fully for unstructured, 
         # but could rely on structured format)
@@ -0,0 +1,75 @@
+import json
+from typing import Dict, List
+
+
+class JsonArrayStreamParser:
+    """Incrementally pulls complete objects out of a streamed JSON array.
+
+    Feed it text chunks as they arrive from the model; every call returns the
+    top-level objects that have been fully received so far. Anything before
+    the opening '[' (such as a ```json fence) is ignored, and objects that
+    fail to decode are skipped rather than aborting the stream.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self._buffer += chunk
+        objects = []
+        buf = self._buffer
+        i = self._pos
+
+        while i < len(buf):
+            ch = buf[i]
+
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._object_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the top-level array
+                    self._in_array = False
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._object_start is not None:
+                        text = buf[self._object_start:i + 1]
+                        self._object_start = None
+                        try:
+                            obj = json.loads(text)
+                            if isinstance(obj, dict):
+                                objects.append(obj)
+                        except json.JSONDecodeError:
+                            self.skipped += 1
+            i += 1
+
+        # Drop consumed text, keeping any partially received object
+        keep_from = self._object_start if self._object_start is not None else i
+        self._buffer = buf[keep_from:]
+        if self._object_start is not None:
+            self._object_start = 0
+        self._pos = i - keep_from
+        return objects
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Set
+
+# Leading bytes of each accepted binary type; text is checked separately
+_SIGNATURES = {
+    ".pdf": [b"%PDF-"],
+    ".png": [b"\x89PNG\r\n\x1a\n"],
+    ".jpg": [b"\xff\xd8\xff"],
+    ".jpeg": [b"\xff\xd8\xff"],
+    ".gif": [b"GIF87a", b"GIF89a"],
+    ".bmp": [b"BM"],
+    ".webp": [b"RIFF"],
+    ".tif": [b"II*\x00", b"MM\x00*"],
+    ".tiff": [b"II*\x00", b"MM\x00*"],
+}
+DEFAULT_ALLOWED = "pdf,png,jpg,jpeg,gif,bmp,webp,tif,tiff,txt"
+# Spellings of the same type share one stored file, so identical bytes never
+# end up under two paths (the row only tracks one, leaving the other to leak)
+_CANONICAL_EXTENSIONS = {".jpeg": ".jpg", ".tiff": ".tif"}
+
+
+class UploadRejectedError(Exception):
+    """The upload is too large or not an accepted file type"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadStore:
+    """Content-addressed storage for uploaded files.
+
+    Files are hashed while they stream to disk and stored once under
+    ``<root>/<sha[:2]>/<sha><ext>``, so re-uploading a syllabus costs no extra
+    space. Size and type limits are checked as the bytes arrive, before the
+    rest of the body is written. Sessions hold references (``uploads.ref_count``);
+    files nobody references after a grace period are removed by
+    ``collect_orphans``.
+    """
+
+    def __init__(self, db, root: Path, max_bytes: Optional[int] = None,
+                 allowed_extensions: Optional[Set[str]] = None, chunk_size: int = 1024 * 1024):
+        self.db = db
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("UPLOAD_MAX_MB", "25")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if allowed_extensions is None:
+            allowed = os.getenv("UPLOAD_ALLOWED_TYPES", DEFAULT_ALLOWED)
+            allowed_extensions = {"." + ext.strip().lower().lstrip(".") for ext in allowed.split(",") if ext.strip()}
+        self.allowed_extensions = allowed_extensions
+        self.chunk_size = chunk_size
+        # Unreferenced files younger than this may belong to an upload still being processed
+        self.orphan_grace_seconds = float(os.getenv("UPLOAD_ORPHAN_GRACE_SECONDS", "3600"))
+
+    def check_extension(self, filename: Optional[str]) -> str:
+        ext = os.path.splitext(filename or "")[1].lower()
+        if ext not in self.allowed_extensions:
+            allowed = ", ".join(sorted(self.allowed_extensions))
+            raise UploadRejectedError(f"Unsupported file type '{ext or filename}'. Allowed: {allowed}", 415)
+        return ext
+
+    def check_declared_size(self, content_length: Optional[int]):
+        """Reject early from the Content-Length header, before the body is read"""
+        # Multipart framing adds a little on top of the file itself
+        if content_length is not None and content_length > self.max_bytes + 64 * 1024:
+            raise UploadRejectedError(f"Upload exceeds the {self._limit_mb()} MB limit", 413)
+
+    def save(self, source: BinaryIO, filename: Optional[str]) -> Dict:
+        """Stream source to the store; returns {"sha256", "path", "size"}"""
+        ext = self.check_extension(filename)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=ext)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                first = True
+                for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                    if first:
+                        self._check_content_type(ext, chunk)
+                        first = False
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadRejectedError(f"Upload exceeds the {self._limit_mb()} MB limit", 413)
+                    digest.update(chunk)
+                    out.write(chunk)
+            if size == 0:
+                raise UploadRejectedError("Uploaded file is empty", 400)
+
+            sha256 = digest.hexdigest()
+            final_path = self.path_for(sha256, _CANONICAL_EXTENSIONS.get(ext, ext))
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            # Register before the file lands so a concurrent collect_orphans
+            # sees the fresh timestamp and leaves the file alone
+            self.db.register_upload(sha256, str(final_path), size)
+            # Always replace: the bytes are identical, and it restores a file
+            # an orphan sweep removed between our hash and the registration
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return {"sha256": sha256, "path": str(final_path), "size": size}
+
+    def path_for(self, sha256: str, ext: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}{ext}"
+
+    def collect_orphans(self) -> int:
+        """Delete stored files no session references; returns how many were removed"""
+        cutoff = time.time() - self.orphan_grace_seconds
+        removed = 0
+        for upload in self.db.find_orphaned_uploads(cutoff):
+            if not self.db.delete_orphaned_upload(upload["sha256"], cutoff):
+                continue  # referenced or re-uploaded in the meantime
+
+            path = upload["path"]
+            trash = str(self.tmp_dir / f"gc-{uuid.uuid4().hex}")
+            try:
+                os.replace(path, trash)
+            except FileNotFoundError:
+                continue
+            # A save() racing with us re-registers before writing; put the file back
+            if self.db.get_upload(upload["sha256"]) is not None:
+                os.replace(trash, path)
+                continue
+            os.unlink(trash)
+            removed += 1
+
+        # Temp files left behind by crashed workers
+        for leftover in self.tmp_dir.iterdir():
+            try:
+                if leftover.stat().st_mtime < cutoff:
+                    leftover.unlink()
+            except FileNotFoundError:
+                pass
+
+        if removed:
+            print(f"Removed {removed} orphaned upload(s)")
+        return removed
+
+    def stats(self) -> Dict:
+        return {**self.db.upload_stats(), "max_bytes": self.max_bytes}
+
+    def _check_content_type(self, ext: str, head: bytes):
+        if ext == ".txt":
+            if b"\x00" in head:
+                raise UploadRejectedError("File content does not look like text", 415)
+            return
+        signatures = _SIGNATURES.get(ext)
+        if signatures and not any(head.startswith(sig) for sig in signatures):
+            raise UploadRejectedError(f"File content does not match its '{ext}' extension", 415)
+
+    def _limit_mb(self) -> str:
+        return f"{self.max_bytes / (1024 * 1024):g}"
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already has its maximum number of jobs in flight"""
+
+
+class BoundedPool:
+    """Executor wrapper that rejects work once running + queued jobs hit a limit"""
+
+    def __init__(self, name: str, executor: Executor, max_workers: int, max_queue: int):
+        self.name = name
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._capacity = max_workers + max_queue
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self._capacity:
+                raise PoolSaturatedError(f"{self.name} pool is busy, please retry shortly")
+            self._in_flight += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """Submit work from synchronous code, returns a concurrent.futures.Future"""
+        self._acquire()
+        try:
+            future = self.executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run work on the pool and await the result from the event loop"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers)
+        }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+class ExecutorService:
+    """Separate bounded pools for blocking I/O (threads) and CPU-bound work (processes).
+
+    Slow external calls (Gemini, OCR) and quick sqlite queries get their own thread
+    pools so that a burst of uploads can never starve lightweight reads like /api/stats.
+    """
+
+    def __init__(self):
+        io_workers = int(os.getenv("IO_POOL_WORKERS", "16"))
+        io_queue = int(os.getenv("IO_POOL_MAX_QUEUE", "64"))
+        db_workers = int(os.getenv("DB_POOL_WORKERS", "4"))
+        db_queue = int(os.getenv("DB_POOL_MAX_QUEUE", "256"))
+        cpu_workers = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 2)))
+        cpu_queue = int(os.getenv("CPU_POOL_MAX_QUEUE", "32"))
+
+        self.io = BoundedPool(
+            "I/O",
+            ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io-pool"),
+            io_workers,
+            io_queue
+        )
+        self.db = BoundedPool(
+            "Database",
+            ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="db-pool"),
+            db_workers,
+            db_queue
+        )
+        # Process pool is created on first use so importing the app stays cheap
+        self._cpu = None
+        self._cpu_workers = cpu_workers
+        self._cpu_queue = cpu_queue
+        self._cpu_lock = threading.Lock()
+
+    @property
+    def cpu(self) -> BoundedPool:
+        if self._cpu is None:
+            with self._cpu_lock:
+                if self._cpu is None:
+                    self._cpu = BoundedPool(
+                        "CPU",
+                        ProcessPoolExecutor(max_workers=self._cpu_workers),
+                        self._cpu_workers,
+                        self._cpu_queue
+                    )
+        return self._cpu
+
+    async def run_io(self, func: Callable, *args, **kwargs):
+        """Run slow blocking network/disk work (Gemini, OCR) off the event loop"""
+        return await self.io.run(func, *args, **kwargs)
+
+    async def run_db(self, func: Callable, *args, **kwargs):
+        """Run sqlite work off the event loop"""
+        return await self.db.run(func, *args, **kwargs)
+
+    async def run_cpu(self, func: Callable, *args, **kwargs):
+        """Run CPU-bound work in a worker process (func and args must be picklable)"""
+        return await self.cpu.run(func, *args, **kwargs)
+
+    def stats(self) -> Dict:
+        return {
+            "io": self.io.stats(),
+            "db": self.db.stats(),
+            "cpu": self._cpu.stats() if self._cpu else None
+        }
+
+    def shutdown(self):
+        self.io.shutdown(wait=False)
+        self.db.shutdown(wait=False)
+        if self._cpu is not None:
+            self._cpu.shutdown(wait=False)
@@ -5,12 +5,12 @@ def extract_text_from_pdf(file_content: bytes) -> str:
     """Extracts text from a PDF file content."""
     try:
         pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
+        page_texts = []
         for page in pdf_reader.pages:
             page_text = page.extract_text()
             if page_text:
-                text += page_text + "\n"
-        return text.strip()
+                page_texts.append(page_text)
+        return "\n".join(page_texts).strip()
     except Exception as e:
         print(f"Error extracting PDF: {e}")
         return ""